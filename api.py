@@ -0,0 +1,183 @@
+from flask import Blueprint, Response, current_app, request, jsonify, abort, stream_with_context, json
+
+from models import Venue, Artist, Show
+from cache import detail_cache, venue_key, artist_key
+from queries import iterate_in_batches
+from routing import read_only
+from tokens import TokenGate
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def requested_fields():
+    """Fields named in ?fields=a,b, or None for every field."""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(',') if field.strip()]
+
+
+def select_fields(data, fields):
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+
+def stream_collection(query, key, serialize):
+    """Stream query as a JSON array, one batch of rows at a time, so a full
+    export never holds the whole collection in memory."""
+    fields = requested_fields()
+    batch_size = current_app.config.get('API_STREAM_BATCH_SIZE', 500)
+
+    def generate():
+        yield '['
+        for index, row in enumerate(iterate_in_batches(query, key, batch_size)):
+            yield (',' if index else '') + json.dumps(select_fields(serialize(row), fields))
+        yield ']'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def detail_response(data):
+    if data is None:
+        abort(404)
+    return jsonify(select_fields(data, requested_fields()))
+
+
+def past_shows_response(model, foreign_key, entity_id):
+    """The past shows of a venue/artist older than ?before=, the
+    past_shows_cursor of its detail response or of a previous page."""
+    if model.query.filter(model.id == entity_id).count() == 0:
+        abort(404)
+    try:
+        shows, next_cursor = Show.past_page(foreign_key == entity_id, request.args.get('before'),
+                                            current_app.config['PAST_SHOWS_PER_PAGE'])
+    except ValueError:
+        abort(400)
+    return jsonify({'past_shows': shows, 'next_cursor': next_cursor})
+
+
+@api.errorhandler(404)
+def not_found(error):
+    return jsonify({'error': 404, 'message': 'Not found'}), 404
+
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+@api.route('/venues')
+@read_only
+def venues():
+    return stream_collection(Venue.query, Venue.id, lambda venue: venue.venue_details)
+
+
+@api.route('/venues/<int:venue_id>')
+@read_only
+def venue(venue_id):
+    def load_venue():
+        venue = Venue.query.get(venue_id)
+        return venue and venue.get_venue_with_show_details
+
+    return detail_response(detail_cache.get_or_set(venue_key(venue_id), load_venue))
+
+
+@api.route('/venues/<int:venue_id>/past_shows')
+@read_only
+def venue_past_shows(venue_id):
+    return past_shows_response(Venue, Show.venue_id, venue_id)
+
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+@api.route('/artists')
+@read_only
+def artists():
+    return stream_collection(Artist.query, Artist.id, lambda artist: artist.artist_details)
+
+
+@api.route('/artists/<int:artist_id>')
+@read_only
+def artist(artist_id):
+    def load_artist():
+        artist = Artist.query.get(artist_id)
+        return artist and artist.get_artist_with_show_details
+
+    return detail_response(detail_cache.get_or_set(artist_key(artist_id), load_artist))
+
+
+@api.route('/artists/<int:artist_id>/past_shows')
+@read_only
+def artist_past_shows(artist_id):
+    return past_shows_response(Artist, Show.artist_id, artist_id)
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+@api.route('/shows')
+@read_only
+def shows():
+    return stream_collection(Show.query, Show.id, lambda show: show.show_details)
+
+
+@api.route('/shows/<int:show_id>')
+@read_only
+def show(show_id):
+    show = Show.query_with_artist_venue().filter(Show.id == show_id).one_or_none()
+    return detail_response(show and show.show_with_artist_venue)
+
+
+#----------------------------------------------------------------------------#
+# Import.
+#----------------------------------------------------------------------------#
+
+import_tokens = TokenGate('IMPORT', 'import', 'X-Fyyur-Import')
+
+
+@api.route('/import/<kind>', methods=['POST'])
+def import_data(kind):
+    """Bulk import the request body, CSV or JSONL (?format=, defaulting to
+    csv), and report the inserted count and per-row errors. Only for
+    requests carrying an import token (see IMPORT_SECRET)."""
+    from importer import IMPORTERS, read_rows, text_stream, import_rows
+
+    if not import_tokens.has_token(current_app) or kind not in IMPORTERS:
+        abort(404)
+    format = request.args.get('format', 'csv')
+    if format not in ('csv', 'jsonl'):
+        return jsonify({'error': 400, 'message': 'format must be csv or jsonl'}), 400
+    result = import_rows(kind, read_rows(text_stream(request.stream), format),
+                         current_app.config.get('IMPORT_BATCH_SIZE', 1000))
+    return jsonify(result)
+
+
+#----------------------------------------------------------------------------#
+# Export.
+#----------------------------------------------------------------------------#
+
+@api.route('/export/<kind>')
+@read_only
+def export_data(kind):
+    """Stream every venue, artist or show as CSV or JSONL (?format=)."""
+    from exporter import CHUNKERS, EXPORTS, export_rows
+
+    format = request.args.get('format', 'csv')
+    if kind not in EXPORTS:
+        abort(404)
+    if format not in CHUNKERS:
+        return jsonify({'error': 400, 'message': 'format must be csv or jsonl'}), 400
+
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    columns, rows = export_rows(kind, batch_size)
+    mimetype = 'text/csv' if format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(CHUNKERS[format](columns, rows, batch_size)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = 'attachment; filename={0}.{1}'.format(kind, format)
+    return response
@@ -2,10 +2,10 @@
 # Imports
 #----------------------------------------------------------------------------#
 
+import os
 import sys
 import json
-import dateutil.parser
-import babel
+import click
 from flask import (
   Flask,
   render_template,
@@ -14,14 +14,29 @@ from flask import (
   flash,
   redirect,
   url_for,
-  abort
+  abort,
+  jsonify,
+  g
 )
 from flask_moment import Moment
-import logging
-from logging import Formatter, FileHandler
 from forms import *
 from flask_migrate import Migrate
 from models import db, Artist, Venue, Show
+from cache import detail_cache, recent_feed, venue_key, artist_key
+from queries import venues_grouped_by_area, artists_page, shows_page
+import search
+import http_cache
+from http_cache import conditional
+from api import api
+from pool import render_metrics
+from routing import read_only
+from instrumentation import request_metrics
+import logs
+from profiling import request_profiler
+from dates import format_datetime, JSONEncoder
+import templating
+from scheduler import scheduler
+import jobs
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -30,8 +45,20 @@ from models import db, Artist, Venue, Show
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
+if not app.config['SECRET_KEY'] and not app.config.get('SQLALCHEMY_REPLICA_URIS'):
+    # Single process only, see config.py.
+    app.config['SECRET_KEY'] = os.urandom(32)
+logs.init_app(app)
 db.init_app(app)
+detail_cache.init_app(app)
+recent_feed.init_app(app)
+request_metrics.init_app(app)
+request_profiler.init_app(app)
+templating.init_app(app)
+scheduler.init_app(app)
+jobs.register(scheduler, app.config)
 migrate = Migrate(app, db)
+app.register_blueprint(api)
 # TODO: connect to a local postgresql database
 
 #----------------------------------------------------------------------------#
@@ -43,39 +70,29 @@ migrate = Migrate(app, db)
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
-  if format == 'full':
-      format="EEEE MMMM, d, y 'at' h:mma"
-  elif format == 'medium':
-      format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format, locale='en')
-
+# Templates receive native datetimes; see dates.py for the pattern cache and
+# timezone handling.
 app.jinja_env.filters['datetime'] = format_datetime
+app.json_encoder = JSONEncoder
 
-
-def show_with_artist_venue(show):
-  venues = Venue.query.filter(Venue.id == show.venue_id).one()
-  venue = venues.venue_details
-
-  artists = Artist.query.filter(Artist.id == show.artist_id).one()
-  artist = artists.artist_details
-  return {
-    'id': show.id,
-    'start_time': show.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-    'venue': venue,
-    'artist': artist,
-  }
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
 
-def recent_venue_artist():
-    recent_venues = Venue.query.order_by(Venue.id.desc()).limit(10).all()
-    recent_artists = Artist.query.order_by(Artist.id).limit(10).all()
+def load_recent_venues(limit):
+    return [venue.venue_details for venue in Venue.query.order_by(Venue.id.desc()).limit(limit)]
 
-    venue_data = [venue.venue_details for venue in recent_venues]
-    artist_data = [artist.artist_details for artist in recent_artists]
+def load_recent_artists(limit):
+    return [artist.artist_details for artist in Artist.query.order_by(Artist.id.desc()).limit(limit)]
+
+def recent_venue_artist():
+    # Served from the in-memory feed, which is only reloaded when a write
+    # changed the rows it lists.
+    venue_version, artist_version = g.get('feed_versions') or (
+        http_cache.feed_version(Venue, recent_feed.venues.size),
+        http_cache.feed_version(Artist, recent_feed.artists.size))
+    venue_data = recent_feed.venues.get(load_recent_venues, venue_version)
+    artist_data = recent_feed.artists.get(load_recent_artists, artist_version)
     response = {
         "venue_data": venue_data,
         "artist_data": artist_data
@@ -84,6 +101,8 @@ def recent_venue_artist():
     return response
 
 @app.route('/')
+@read_only
+@conditional(http_cache.index_version)
 def index():
   response = recent_venue_artist()
   return render_template('pages/home.html', results=response)
@@ -93,90 +112,63 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@read_only
+@conditional(http_cache.venues_version)
 def venues():
   # TODO: replace with real venues data.
   #       num_shows should be aggregated based on number of upcoming shows per venue.
-  venues = Venue.query.distinct(Venue.city, Venue.state).all()
-  data = [venue.group_venue_by_city_state for venue in venues]
+  data = venues_grouped_by_area(genre=request.args.get('genre'))
 
   return render_template('pages/venues.html', areas=data)
 
 @app.route('/venues/search', methods=['POST'])
+@read_only
 def search_venues():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for Hop should return "The Musical Hop".
   # search for "Music" should return "The Musical Hop" and "Park Square Live Music & Coffee"
   search_term = request.form.get('search_term', '')
-  venues = Venue.query.filter(Venue.name.ilike("%{}%".format(search_term))).all()
-  data = [venue.venue_details for venue in venues]
-  print(data)
-  response={
-    "count": len(venues),
-    "data": data
-  }
+  page = request.form.get('page', 1, type=int)
+  response = search.search_venues(search_term, page, app.config['SEARCH_RESULTS_PER_PAGE'])
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/city-state-search', methods=['POST'])
+@read_only
 def search_venues_by_city_state():
   search_term = request.form.get('search_term', '')
-  search_terms = search_term.split(',')
-  city = search_terms[0].strip(" ")
-  state = search_terms[1].strip(" ")
-  venues = Venue.query.filter(Venue.city.ilike("%{}%".format(city)), Venue.state.ilike("%{}%".format(state))).all()
-  data = [venue.venue_details for venue in venues]
-  response={
-    "count": len(venues),
-    "data": data
-  }
+  page = request.form.get('page', 1, type=int)
+  response = search.search_venues_by_city_state(search_term, page, app.config['SEARCH_RESULTS_PER_PAGE'])
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/<int:venue_id>')
+@read_only
+@conditional(http_cache.venue_version)
 def show_venue(venue_id):
   # shows the venue page with the given venue_id
   # TODO: replace with real venue data from the venues table, using venue_id
-  venue = Venue.query.filter(Venue.id == venue_id).one_or_none()
+  def load_venue():
+    venue = Venue.query.filter(Venue.id == venue_id).one_or_none()
+    return venue and venue.get_venue_with_show_details
 
-  if venue is None:
+  data = detail_cache.get_or_set(venue_key(venue_id), load_venue, g.get('page_version'))
+  if data is None:
     abort(404)
 
-  upcoming_shows_details = db.session.query(Artist, Show).join(Show).join(Venue). \
-    filter(
-    Show.start_time > datetime.datetime.now(),
-    Show.venue_id == venue_id,
-    Show.artist_id == Artist.id
-  ).all()
-
-  upcoming_shows = [show_with_artist_venue(show) for artist, show in upcoming_shows_details]
-
-  past_show_details = db.session.query(Artist, Show).join(Show).join(Venue). \
-    filter(
-    Show.start_time < datetime.datetime.now(),
-    Show.venue_id == venue_id,
-    Show.artist_id == Artist.id
-  ).all()
-
-  past_shows = [show_with_artist_venue(show) for artist, show in past_show_details]
-
-  data = {
-    'id': venue.id,
-    'name': venue.name,
-    'city': venue.city,
-    'state': venue.state,
-    'phone': venue.phone,
-    'address': venue.address,
-    'image_link': venue.image_link,
-    'facebook_link': venue.facebook_link,
-    'seeking_talent': venue.seeking_talent,
-    'seeking_description': venue.seeking_description,
-    'website': venue.website,
-    'upcoming_shows': upcoming_shows,
-    'past_shows': past_shows,
-    'upcoming_shows_count': len(upcoming_shows_details),
-    'past_shows_count': len(past_show_details),
-    'genres': venue.genres.split(','),
-  }
   return render_template('pages/show_venue.html', venue=data)
 
+@app.route('/venues/<int:venue_id>/past-shows')
+@read_only
+def venue_past_shows(venue_id):
+  venue = db.session.query(Venue.id, Venue.name).filter(Venue.id == venue_id).one_or_none()
+  if venue is None:
+    abort(404)
+  cursor = request.args.get('before')
+  try:
+    data, next_cursor = Show.past_page(Show.venue_id == venue_id, cursor, app.config['PAST_SHOWS_PER_PAGE'])
+  except ValueError:
+    abort(400)
+  return render_template('pages/past_shows.html', kind='venue', owner=venue, shows=data, next_cursor=next_cursor)
+
 #  Create Venue
 #  ----------------------------------------------------------------
 
@@ -214,8 +206,9 @@ def delete_venue(venue_id):
   # clicking that button delete it from the db then redirect the user to the homepage
   try:
     venue = Venue.query.filter(Venue.id == venue_id).one()
+    name = venue.name
     venue.delete()
-    flash("Venue {0} has been deleted successfully".format(venue[0]['name']))
+    flash("Venue {0} has been deleted successfully".format(name))
   except:
     abort(404)
   response = recent_venue_artist()
@@ -251,7 +244,7 @@ def edit_venue_submission(venue_id):
     try:
         venue = Venue.query.filter_by(id=venue_id).one()
         venue.name = form.name.data
-        venue.genres = ','.join(form.genres.data)
+        venue.genres = form.genres.data
         venue.city = form.city.data
         venue.state = form.state.data
         venue.phone = form.phone.data
@@ -266,92 +259,70 @@ def edit_venue_submission(venue_id):
         # on successful db insert, flash success
         flash(f'Venue was successfully updated!')
     except:
-        print(sys.exc_info())
+        app.logger.exception('Venue %s could not be updated', venue_id)
         flash(f'An error occurred. Venue could not be changed.')
     return redirect(url_for('show_venue', venue_id=venue_id))
 
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@read_only
+@conditional(http_cache.artists_version)
 def artists():
   # TODO: replace with real data returned from querying the database
-  artists = Artist.query.all()
-  data = [artist.get_artist_with_show_details for artist in artists]
-  return render_template('pages/artists.html', artists=data)
+  after = request.args.get('after', type=int)
+  genre = request.args.get('genre')
+  data, next_cursor = artists_page(after, app.config['ARTISTS_PER_PAGE'], genre)
+  return render_template('pages/artists.html', artists=data, next_cursor=next_cursor, after=after, genre=genre)
 
 @app.route('/artists/search', methods=['POST'])
+@read_only
 def search_artists():
   # TODO: implement search on artists with partial string search. Ensure it is case-insensitive.
   # seach for "A" should return "Guns N Petals", "Matt Quevado", and "The Wild Sax Band".
   # search for "band" should return "The Wild Sax Band".
   search_term = request.form.get('search_term', '')
-  artists = Artist.query.filter(Artist.name.ilike("%{}%".format(search_term))).all()
-  data = [artist.artist_details for artist in artists]
-  response = {
-    "count": len(artists),
-    "data": data
-  }
+  page = request.form.get('page', 1, type=int)
+  response = search.search_artists(search_term, page, app.config['SEARCH_RESULTS_PER_PAGE'])
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/city-state-search', methods=['POST'])
+@read_only
 def search_artists_by_city_state():
   search_term = request.form.get('search_term', '')
-  search_terms = search_term.split(',')
-  city = search_terms[0].strip(" ")
-  state = search_terms[1].strip(" ")
-  artists = Artist.query.filter(Artist.city.ilike("%{}%".format(city)), Artist.state.ilike("%{}%".format(state))).all()
-  data = [artist.artist_details for artist in artists]
-  response={
-    "count": len(artists),
-    "data": data
-  }
-  return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
+  page = request.form.get('page', 1, type=int)
+  response = search.search_artists_by_city_state(search_term, page, app.config['SEARCH_RESULTS_PER_PAGE'])
+  return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
+@read_only
+@conditional(http_cache.artist_version)
 def show_artist(artist_id):
   # shows the venue page with the given venue_id
   # TODO: replace with real venue data from the venues table, using venue_id
-  artist = Artist.query.filter(Artist.id == artist_id).one_or_none()
+  def load_artist():
+    artist = Artist.query.filter(Artist.id == artist_id).one_or_none()
+    return artist and artist.get_artist_with_show_details
 
-  if artist is None:
+  data = detail_cache.get_or_set(artist_key(artist_id), load_artist, g.get('page_version'))
+  if data is None:
     abort(404)
 
-  upcoming_shows_details = db.session.query(Artist, Show).join(Show).join(Venue). \
-    filter(
-    Show.start_time > datetime.datetime.now(),
-    Show.venue_id == Venue.id,
-    Show.artist_id == artist_id
-  ).all()
-  upcoming_shows = [show_with_artist_venue(show) for artist, show in upcoming_shows_details]
-
-  past_show_details = db.session.query(Artist, Show).join(Show).join(Venue). \
-    filter(
-    Show.start_time < datetime.datetime.now(),
-    Show.venue_id == Venue.id,
-    Show.artist_id == artist_id
-  ).all()
-  past_shows = [show_with_artist_venue(show) for artist, show in past_show_details]
-
-  data = {
-    'id': artist.id,
-    'name': artist.name,
-    'city': artist.city,
-    'state': artist.state,
-    'phone': artist.phone,
-    'genres': artist.genres.split(','),
-    'image_link': artist.image_link,
-    'facebook_link': artist.facebook_link,
-    'seeking_venue': artist.seeking_venue,
-    'seeking_description': artist.seeking_description,
-    'website': artist.website,
-    'upcoming_shows': upcoming_shows,
-    'past_shows': past_shows,
-    'upcoming_shows_count': len(upcoming_shows_details),
-    'past_shows_count': len(past_show_details)
-  }
-  print(data)
   return render_template('pages/show_artist.html', artist=data)
 
+@app.route('/artists/<int:artist_id>/past-shows')
+@read_only
+def artist_past_shows(artist_id):
+  artist = db.session.query(Artist.id, Artist.name).filter(Artist.id == artist_id).one_or_none()
+  if artist is None:
+    abort(404)
+  cursor = request.args.get('before')
+  try:
+    data, next_cursor = Show.past_page(Show.artist_id == artist_id, cursor, app.config['PAST_SHOWS_PER_PAGE'])
+  except ValueError:
+    abort(400)
+  return render_template('pages/past_shows.html', kind='artist', owner=artist, shows=data, next_cursor=next_cursor)
+
 #  Update
 #  ----------------------------------------------------------------
 @app.route('/artists/<int:artist_id>/edit', methods=['GET'])
@@ -385,7 +356,7 @@ def edit_artist_submission(artist_id):
   try:
     artist = Artist.query.filter_by(id=artist_id).one()
     artist.name = form.name.data
-    artist.genres = ','.join(form.genres.data)
+    artist.genres = form.genres.data
     artist.city = form.city.data
     artist.state = form.state.data
     artist.phone = form.phone.data
@@ -398,7 +369,7 @@ def edit_artist_submission(artist_id):
     artist.update()
     flash('Artist ' + request.form['name'] + ' was successfully updated!')
   except:
-    print(sys.exc_info())
+    app.logger.exception('Artist %s could not be updated', artist_id)
     flash('An error occurred. Artist ' + request.form['name'] + ' could not be updated.')
   return redirect(url_for('show_artist', artist_id=artist_id))
 
@@ -435,8 +406,9 @@ def create_artist_submission():
 def delete_artist(artist_id):
   try:
     artist = Artist.query.filter(Artist.id == artist_id).one()
+    name = artist.name
     artist.delete()
-    flash("Artist {0} has been deleted successfully".format(artist[0]['name']))
+    flash("Artist {0} has been deleted successfully".format(name))
   except:
     abort(404)
 
@@ -446,14 +418,18 @@ def delete_artist(artist_id):
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@read_only
+@conditional(http_cache.shows_version)
 def shows():
   # displays list of shows at /shows
   # TODO: replace with real venues data.
   #       num_shows should be aggregated based on number of upcoming shows per venue.
-  shows = Show.query.all()
-  data = [show.show_with_artist_venue for show in shows]
-  print(data)
-  return render_template('pages/shows.html', shows=data)
+  cursor = request.args.get('after')
+  try:
+    data, next_cursor = shows_page(cursor, app.config['SHOWS_PER_PAGE'])
+  except ValueError:
+    abort(400)
+  return render_template('pages/shows.html', shows=data, next_cursor=next_cursor, after=cursor)
 
 @app.route('/shows/create', methods=['GET'])
 def create_shows():
@@ -487,6 +463,14 @@ def create_show_submission():
   response = recent_venue_artist()
   return render_template('pages/home.html', results=response)
 
+@app.route('/metrics')
+def metrics():
+  return Response(render_metrics(db.engine) + request_metrics.render() + scheduler.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+  return jsonify(detail_cache.stats())
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -496,15 +480,175 @@ def server_error(error):
     return render_template('errors/500.html'), 500
 
 
-if not app.debug:
-    file_handler = FileHandler('error.log')
-    file_handler.setFormatter(
-        Formatter('%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]')
+#----------------------------------------------------------------------------#
+# CLI.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('check-indexes')
+def check_indexes():
+    """EXPLAIN the hot queries and fail if one stops using its index."""
+    from query_plans import check_query_plans
+
+    failures = check_query_plans()
+    for name, index, plan in failures:
+        click.echo('{0}: expected {1}\n{2}\n'.format(name, index, plan), err=True)
+    if failures:
+        sys.exit(1)
+    click.echo('All query plans use their indexes.')
+
+@app.cli.command('compile-templates')
+def compile_templates():
+    """Compile every template into the bytecode cache, e.g. before starting workers."""
+    if not app.config.get('TEMPLATE_BYTECODE_CACHE_DIR'):
+        raise click.ClickException('TEMPLATE_BYTECODE_CACHE_DIR is not set.')
+    names = templating.compile_templates(app)
+    click.echo('Compiled {0} templates into {1}.'.format(len(names), app.config['TEMPLATE_BYTECODE_CACHE_DIR']))
+
+@app.cli.command('refresh-show-counts')
+@click.option('--since', type=click.DateTime(),
+              help='Only recount venues/artists with shows that started after this time.')
+def refresh_show_counts(since):
+    """Re-bucket the upcoming/past show counters of venues and artists."""
+    changed = Show.refresh_counts(since=since)
+    db.session.commit()
+    click.echo('Updated the show counts of {0} venues and artists.'.format(changed))
+
+@app.cli.command('jobs')
+def list_jobs():
+    """List the background jobs and how often they run."""
+    for job in scheduler.jobs.values():
+        click.echo('{0:24} every {1}s'.format(job.name, job.interval) if job.interval else
+                   '{0:24} on demand'.format(job.name))
+
+@app.cli.command('run-job')
+@click.argument('name')
+def run_job(name):
+    """Run a background job now, e.g. from cron when SCHEDULER_BACKEND is None."""
+    if name not in scheduler.jobs:
+        raise click.UsageError('Unknown job {0!r}, see `flask jobs`.'.format(name))
+    result = scheduler.run(name)
+    job = scheduler.jobs[name]
+    if job.last_error is not None:
+        raise click.ClickException('{0} failed: {1}'.format(name, job.last_error))
+    click.echo('{0} finished in {1:.1f}ms: {2}'.format(name, job.last_duration * 1000, result))
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl']),
+              help='Defaults to the file extension.')
+def import_data(kind, path, format):
+    """Bulk import venues, artists or shows from a CSV or JSONL file."""
+    from importer import read_rows, import_rows
+
+    format = format or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+    with open(path, encoding='utf-8', newline='') as stream:
+        result = import_rows(kind, read_rows(stream, format), app.config['IMPORT_BATCH_SIZE'])
+    for error in result['errors']:
+        click.echo('line {0}: {1}'.format(error['line'], json.dumps(error['errors'])), err=True)
+    click.echo('Imported {0} {1}, {2} rows rejected.'.format(result['inserted'], kind, len(result['errors'])))
+
+@app.cli.command('export-data')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.option('--format', 'format', type=click.Choice(['csv', 'jsonl', 'parquet']), default='csv')
+@click.option('--output', '-o', type=click.Path(dir_okay=False),
+              help='Defaults to standard output (not available for parquet).')
+def export_data(kind, format, output):
+    """Export all venues, artists or shows in constant memory."""
+    from exporter import CHUNKERS, export_rows, export_types, write_parquet
+
+    batch_size = app.config['EXPORT_BATCH_SIZE']
+    columns, rows = export_rows(kind, batch_size)
+    if format == 'parquet':
+        if not output:
+            raise click.UsageError('--output is required for parquet.')
+        try:
+            write_parquet(columns, export_types(kind), rows, output, batch_size)
+        except RuntimeError as ex:
+            raise click.ClickException(str(ex))
+        return
+    with click.open_file(output or '-', 'w', encoding='utf-8') as stream:
+        for chunk in CHUNKERS[format](columns, rows, batch_size):
+            stream.write(chunk)
+
+@app.cli.command('profile-token')
+def profile_token():
+    """Print a token that profiles any request sending it in PROFILING_HEADER."""
+    from profiling import make_token
+
+    if not app.config.get('PROFILING_SECRET'):
+        raise click.ClickException('Set PROFILING_SECRET in config.py first.')
+    click.echo('{0}: {1}'.format(app.config['PROFILING_HEADER'], make_token(app)))
+
+@app.cli.command('import-token')
+def import_token():
+    """Print a token that allows POST /api/v1/import/<kind> when sent in IMPORT_HEADER."""
+    from api import import_tokens
+
+    if not app.config.get('IMPORT_SECRET'):
+        raise click.ClickException('Set IMPORT_SECRET in config.py first.')
+    click.echo('{0}: {1}'.format(app.config['IMPORT_HEADER'], import_tokens.make_token(app)))
+
+@app.cli.command('benchmark')
+@click.option('--database', default=None,
+              help='Database to fill and benchmark; it is emptied first. Defaults to a SQLite file in the temp directory.')
+@click.option('--venues', default=200)
+@click.option('--artists', default=500)
+@click.option('--shows', default=5000)
+@click.option('--cities', default=20)
+@click.option('--seed', default=1, help='Same seed, same data.')
+@click.option('--iterations', '-n', default=20, help='Timed requests per route.')
+@click.option('--warm', is_flag=True, help='Keep the in-process caches between requests.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), help='Write the results as JSON.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Fail if the results regress against this earlier --output.')
+@click.option('--tolerance', default=0.25, help='Allowed relative growth of p95 latency and peak memory.')
+def run_benchmark(database, venues, artists, shows, cities, seed, iterations, warm, output, baseline, tolerance):
+    """Benchmark every route on seeded synthetic data."""
+    import tempfile
+    import benchmark
+
+    database = database or 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'fyyur-benchmark.db')
+    if database == app.config['SQLALCHEMY_DATABASE_URI']:
+        raise click.UsageError('Refusing to empty the application database; pass another --database.')
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database,
+        SQLALCHEMY_REPLICA_URIS=[],
+        WTF_CSRF_ENABLED=False,
+        PROFILING_ENABLED=False,
+        SLOW_REQUEST_MS=None,
+        SLOW_REQUEST_QUERIES=None,
     )
-    app.logger.setLevel(logging.INFO)
-    file_handler.setLevel(logging.INFO)
-    app.logger.addHandler(file_handler)
-    app.logger.info('errors')
+    results = benchmark.benchmark(app, venues, artists, shows, cities, seed, iterations, warm)
+    click.echo(benchmark.format_results(results))
+    if output:
+        benchmark.save(results, output)
+    if baseline:
+        regressions = benchmark.compare(results, benchmark.load(baseline), tolerance)
+        for regression in regressions:
+            click.echo(regression, err=True)
+        if regressions:
+            sys.exit(1)
+
+@app.cli.command('benchmark-datetime')
+@click.option('--count', '-n', default=10000, help='Number of show times to format.')
+def benchmark_datetime(count):
+    """Compare the per-show cost of the old and new datetime filter."""
+    from benchmark import datetime_filter_costs
+
+    costs = datetime_filter_costs(app, count)
+    click.echo('{shows} shows: {before_us:.1f}us per show before, {after_us:.1f}us after'.format(**costs))
+
+@app.cli.command('load-test')
+@click.argument('urls', nargs=-1, required=True)
+@click.option('--concurrency', '-c', default=50, help='Concurrent clients.')
+@click.option('--requests', '-n', default=1000, help='Requests per URL.')
+def load_test(urls, concurrency, requests):
+    """GET each URL of a running server concurrently and report throughput."""
+    from loadtest import run, format_result
+
+    for url in urls:
+        click.echo(format_result(run(url, concurrency, requests)))
 
 #----------------------------------------------------------------------------#
 # Launch.
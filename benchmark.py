@@ -0,0 +1,354 @@
+import datetime
+import json
+import os
+import platform
+import random
+import time
+import tracemalloc
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
+
+from models import db, Genre, Venue, Artist, Show, venue_genre, artist_genre
+from cache import detail_cache, recent_feed
+from forms import genres_choices, states_choices
+import search
+from scheduler import scheduler
+
+
+#----------------------------------------------------------------------------#
+# Synthetic data.
+#----------------------------------------------------------------------------#
+
+def prepare_database(app):
+    """Give the benchmark database an empty, current schema. SQLite gets
+    create_all; other databases are migrated, since the PostgreSQL search
+    columns only exist in the migrations."""
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        if url.database and os.path.exists(url.database):
+            os.remove(url.database)
+        db.create_all()
+        return
+
+    from flask_migrate import upgrade
+
+    db.drop_all()
+    db.session.execute('DROP TABLE IF EXISTS alembic_version')
+    db.session.commit()
+    upgrade(directory=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations'))
+
+
+def insert_in_batches(table, rows, batch_size=1000):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(table.insert(), rows[start:start + batch_size])
+
+
+def generate(venues=200, artists=500, shows=5000, cities=20, seed=1):
+    """Fill the (empty) database with reproducible synthetic data: the same
+    arguments always give the same rows. Returns the generated cities."""
+    rng = random.Random(seed)
+    now = datetime.datetime.now().replace(microsecond=0)
+    genre_names = [name for name, _ in genres_choices]
+    states = [state for state, _ in states_choices]
+    places = [('City {}'.format(index), rng.choice(states)) for index in range(cities)]
+
+    insert_in_batches(Genre.__table__, [
+        {'id': index, 'name': name} for index, name in enumerate(genre_names, 1)
+    ])
+
+    def entity(kind, index):
+        city, state = rng.choice(places)
+        return {
+            'id': index,
+            'name': '{} {} {}'.format(kind, rng.choice(genre_names), index),
+            'city': city,
+            'state': state,
+            'phone': '{:010d}'.format(rng.randrange(10 ** 10)),
+            'image_link': 'https://example.com/{}/{}.jpg'.format(kind.lower(), index),
+            'facebook_link': 'https://www.facebook.com/{}{}'.format(kind.lower(), index),
+            'website': 'https://example.com/{}/{}'.format(kind.lower(), index),
+            'seeking_description': 'Looking for the next show.',
+            'updated_at': now,
+        }
+
+    venue_rows = []
+    for index in range(1, venues + 1):
+        row = entity('Venue', index)
+        row.update(address='{} Main Street'.format(index), seeking_talent=rng.random() < 0.5)
+        venue_rows.append(row)
+    insert_in_batches(Venue.__table__, venue_rows)
+    insert_in_batches(venue_genre, [
+        {'venue_id': index, 'genre_id': genre_id}
+        for index in range(1, venues + 1)
+        for genre_id in rng.sample(range(1, len(genre_names) + 1), rng.randint(1, 3))
+    ])
+
+    artist_rows = []
+    for index in range(1, artists + 1):
+        row = entity('Artist', index)
+        row.update(seeking_venue=rng.random() < 0.5)
+        artist_rows.append(row)
+    insert_in_batches(Artist.__table__, artist_rows)
+    insert_in_batches(artist_genre, [
+        {'artist_id': index, 'genre_id': genre_id}
+        for index in range(1, artists + 1)
+        for genre_id in rng.sample(range(1, len(genre_names) + 1), rng.randint(1, 3))
+    ])
+
+    insert_in_batches(Show.__table__, [
+        {
+            'id': index,
+            'venue_id': rng.randint(1, venues),
+            'artist_id': rng.randint(1, artists),
+            'start_time': now + datetime.timedelta(minutes=rng.randint(-525600, 525600)),
+            'updated_at': now,
+        }
+        for index in range(1, shows + 1)
+    ])
+    Show.refresh_counts(now)
+    db.session.commit()
+    return places
+
+
+#----------------------------------------------------------------------------#
+# Scenarios.
+#----------------------------------------------------------------------------#
+
+# Routes not run: the deletes, which would only find their row once, and the
+# bulk import, which is benchmarked by its batch size rather than per request.
+SKIPPED_ENDPOINTS = {'static', 'delete_venue', 'delete_artist', 'api.import_data'}
+
+
+def scenarios(places):
+    """(endpoint, method, path, form data) for every benchmarked route."""
+    city, state = places[0]
+    venue_form = {
+        'name': 'Venue Benchmark', 'city': city, 'state': state, 'address': '1 Main Street',
+        'phone': '5550100', 'genres': ['Jazz', 'Blues'], 'image_link': 'https://example.com/v.jpg',
+        'facebook_link': 'https://www.facebook.com/venue', 'website': 'https://example.com',
+        'seeking_talent': 'y', 'seeking_description': 'Looking for jazz bands.',
+    }
+    artist_form = {
+        'name': 'Artist Benchmark', 'city': city, 'state': state, 'phone': '5550100',
+        'genres': ['Jazz'], 'image_link': 'https://example.com/a.jpg',
+        'facebook_link': 'https://www.facebook.com/artist', 'website': 'https://example.com',
+        'seeking_venue': 'y', 'seeking_description': 'Looking for venues.',
+    }
+    show_form = {'artist_id': '1', 'venue_id': '1', 'start_time': '2030-01-01 20:00:00'}
+    city_state = {'search_term': '{}, {}'.format(city, state)}
+    return [
+        ('index', 'GET', '/', None),
+        ('venues', 'GET', '/venues', None),
+        ('search_venues', 'POST', '/venues/search', {'search_term': 'jazz'}),
+        ('search_venues_by_city_state', 'POST', '/venues/city-state-search', city_state),
+        ('show_venue', 'GET', '/venues/1', None),
+        ('venue_past_shows', 'GET', '/venues/1/past-shows', None),
+        ('create_venue_form', 'GET', '/venues/create', None),
+        ('create_venue_submission', 'POST', '/venues/create', venue_form),
+        ('edit_venue', 'GET', '/venues/1/edit', None),
+        ('edit_venue_submission', 'POST', '/venues/1/edit', venue_form),
+        ('artists', 'GET', '/artists', None),
+        ('search_artists', 'POST', '/artists/search', {'search_term': 'rock'}),
+        ('search_artists_by_city_state', 'POST', '/artists/city-state-search', city_state),
+        ('show_artist', 'GET', '/artists/1', None),
+        ('artist_past_shows', 'GET', '/artists/1/past-shows', None),
+        ('edit_artist', 'GET', '/artists/1/edit', None),
+        ('edit_artist_submission', 'POST', '/artists/1/edit', artist_form),
+        ('create_artist_form', 'GET', '/artists/create', None),
+        ('create_artist_submission', 'POST', '/artists/create', artist_form),
+        ('shows', 'GET', '/shows', None),
+        ('create_shows', 'GET', '/shows/create', None),
+        ('create_show_submission', 'POST', '/shows/create', show_form),
+        ('metrics', 'GET', '/metrics', None),
+        ('cache_stats', 'GET', '/cache/stats', None),
+        ('api.venues', 'GET', '/api/v1/venues', None),
+        ('api.venue', 'GET', '/api/v1/venues/1', None),
+        ('api.venue_past_shows', 'GET', '/api/v1/venues/1/past_shows', None),
+        ('api.artists', 'GET', '/api/v1/artists', None),
+        ('api.artist', 'GET', '/api/v1/artists/1', None),
+        ('api.artist_past_shows', 'GET', '/api/v1/artists/1/past_shows', None),
+        ('api.shows', 'GET', '/api/v1/shows', None),
+        ('api.show', 'GET', '/api/v1/shows/1', None),
+        ('api.export_data', 'GET', '/api/v1/export/shows?format=jsonl', None),
+    ]
+
+
+#----------------------------------------------------------------------------#
+# Runner.
+#----------------------------------------------------------------------------#
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+def clear_caches(app):
+    detail_cache.clear()
+    if app.jinja_env.fragment_cache is not None:
+        app.jinja_env.fragment_cache.clear()
+    recent_feed.venues.clear()
+    recent_feed.artists.clear()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run(app, places, iterations=20, warm=False):
+    """Request every scenario iterations times (after one warm-up request)
+    and return its p50/p95 latency, SQL statement count and the peak memory
+    allocated while serving it. Unless warm, the in-process caches are
+    emptied before each request, so the database work is measured."""
+    client = app.test_client()
+    counter = QueryCounter()
+    routes = {}
+    event.listen(Engine, 'before_cursor_execute', counter)
+    try:
+        for endpoint, method, path, data in scenarios(places):
+            timings = []
+            for iteration in range(iterations + 1):
+                if not warm:
+                    clear_caches(app)
+                counter.count = 0
+                started = time.perf_counter()
+                response = client.open(path, method=method, data=data)
+                response.get_data()
+                elapsed = time.perf_counter() - started
+                if iteration:
+                    timings.append(elapsed * 1000)
+            queries = counter.count
+
+            # Measured separately: tracemalloc slows everything down.
+            if not warm:
+                clear_caches(app)
+            tracemalloc.start()
+            client.open(path, method=method, data=data).get_data()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            routes[endpoint] = {
+                'method': method,
+                'path': path,
+                'status': response.status_code,
+                'p50_ms': round(percentile(timings, 0.50), 3),
+                'p95_ms': round(percentile(timings, 0.95), 3),
+                'queries': queries,
+                'peak_kib': round(peak / 1024.0, 1),
+            }
+    finally:
+        event.remove(Engine, 'before_cursor_execute', counter)
+
+    covered = set(routes) | SKIPPED_ENDPOINTS
+    return {
+        'routes': routes,
+        'uncovered': sorted(rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint not in covered),
+    }
+
+
+def benchmark(app, venues=200, artists=500, shows=5000, cities=20, seed=1, iterations=20, warm=False):
+    """Generate the synthetic data into app's database and benchmark it."""
+    # Background jobs would compete with the measured requests.
+    scheduler.stop()
+    prepare_database(app)
+    places = generate(venues, artists, shows, cities, seed)
+    search.invalidate()
+    clear_caches(app)
+    results = run(app, places, iterations, warm)
+    results['meta'] = {
+        'time': datetime.datetime.now().isoformat(),
+        'database': make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name(),
+        'python': platform.python_version(),
+        'venues': venues, 'artists': artists, 'shows': shows, 'cities': cities,
+        'seed': seed, 'iterations': iterations, 'warm': warm,
+    }
+    return results
+
+
+#----------------------------------------------------------------------------#
+# Datetime filter.
+#----------------------------------------------------------------------------#
+
+def datetime_filter_costs(app, count=10000):
+    """Microseconds per show spent formatting its start_time, the way the
+    datetime filter used to (serializer strftime, dateutil parse, babel
+    format_datetime) and the way it does now (native datetime, cached
+    pattern and locale)."""
+    import babel.dates
+    import dateutil.parser
+    import dates
+
+    rng = random.Random(0)
+    start = datetime.datetime(2026, 1, 1)
+    values = [start + datetime.timedelta(minutes=rng.randrange(525600)) for _ in range(count)]
+    pattern = dates.NAMED_FORMATS['full']
+
+    started = time.perf_counter()
+    for value in values:
+        babel.dates.format_datetime(dateutil.parser.parse(value.strftime(dates.JSON_FORMAT)), pattern, locale='en')
+    before = time.perf_counter() - started
+
+    with app.app_context():
+        started = time.perf_counter()
+        for value in values:
+            dates.format_datetime(value, 'full')
+        after = time.perf_counter() - started
+
+    return {
+        'shows': count,
+        'before_us': before / count * 1e6,
+        'after_us': after / count * 1e6,
+    }
+
+
+#----------------------------------------------------------------------------#
+# Comparison.
+#----------------------------------------------------------------------------#
+
+def compare(results, baseline, tolerance=0.25, slack_ms=1.0):
+    """Return the regressions of results against baseline: a different
+    status, any increase in query count, and latency (p95) or peak memory
+    growing by more than tolerance. slack_ms keeps sub-millisecond jitter
+    from failing fast routes."""
+    regressions = []
+    for endpoint, before in sorted(baseline['routes'].items()):
+        after = results['routes'].get(endpoint)
+        if after is None:
+            continue
+        if after['status'] != before['status']:
+            # An error page is usually faster; it must not pass as an improvement.
+            regressions.append('{}: status {}, was {}'.format(endpoint, after['status'], before['status']))
+        if after['queries'] > before['queries']:
+            regressions.append('{}: {} queries, was {}'.format(endpoint, after['queries'], before['queries']))
+        if after['p95_ms'] > before['p95_ms'] * (1 + tolerance) + slack_ms:
+            regressions.append('{}: p95 {:.1f}ms, was {:.1f}ms'.format(endpoint, after['p95_ms'], before['p95_ms']))
+        if after['peak_kib'] > before['peak_kib'] * (1 + tolerance):
+            regressions.append('{}: peak memory {:.0f}KiB, was {:.0f}KiB'.format(
+                endpoint, after['peak_kib'], before['peak_kib']))
+    return regressions
+
+
+def format_results(results):
+    lines = ['{:<32} {:>6} {:>10} {:>10} {:>8} {:>10}'.format(
+        'endpoint', 'status', 'p50 ms', 'p95 ms', 'queries', 'peak KiB')]
+    for endpoint, route in results['routes'].items():
+        lines.append('{:<32} {:>6} {:>10.2f} {:>10.2f} {:>8} {:>10.1f}'.format(
+            endpoint, route['status'], route['p50_ms'], route['p95_ms'], route['queries'], route['peak_kib']))
+    if results['uncovered']:
+        lines.append('Not benchmarked: ' + ', '.join(results['uncovered']))
+    return '\n'.join(lines)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        json.dump(results, stream, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as stream:
+        return json.load(stream)
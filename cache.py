@@ -0,0 +1,235 @@
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+
+from routing import pinned_to_primary
+
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+class LRUCache(object):
+    """In-process least recently used cache whose entries expire after ttl seconds."""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RedisCache(object):
+    """Same interface as LRUCache on top of any redis-py compatible client.
+    Values are stored as tagged JSON, which keeps datetimes (to the second)."""
+
+    def __init__(self, client, ttl=60, prefix='fyyur:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.serializer = TaggedJSONSerializer()
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return None if value is None else self.serializer.loads(value)
+
+    def set(self, key, value):
+        self.client.setex(self.prefix + key, self.ttl, self.serializer.dumps(value))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(self.prefix + '*'))
+
+
+def create_backend(app, size, ttl, prefix='fyyur:'):
+    """The backend selected by DETAIL_CACHE_BACKEND: 'memory' or 'redis'."""
+    if app.config.get('DETAIL_CACHE_BACKEND', 'memory') == 'redis':
+        import redis
+        client = redis.Redis.from_url(app.config['DETAIL_CACHE_REDIS_URL'])
+        return RedisCache(client, ttl=ttl, prefix=prefix)
+    return LRUCache(max_size=size, ttl=ttl)
+
+
+#----------------------------------------------------------------------------#
+# Detail page cache.
+#----------------------------------------------------------------------------#
+
+def venue_key(venue_id):
+    return 'venue:{}'.format(venue_id)
+
+
+def artist_key(artist_id):
+    return 'artist:{}'.format(artist_id)
+
+
+def version_stamp(version):
+    """Digest of a page version from http_cache, or None without one."""
+    if version is None:
+        return None
+    return hashlib.sha1(repr(tuple(version)).encode('utf-8')).hexdigest()
+
+
+class DetailCache(object):
+    """Read-through cache of the venue and artist detail page data.
+
+    Entries are stored with the stamp of the page version they were built
+    for and only served for that version, so a page's ETag never describes
+    a different body, whichever process or job wrote to the database.
+    Entries are also invalidated by the CRUD methods of the models; the TTL
+    only bounds entries read without a version (the JSON API). Clients
+    pinned to the primary after a write bypass the cache.
+    """
+
+    def __init__(self, app=None):
+        self.backend = LRUCache()
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.views = Counter()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('DETAIL_CACHE_ENABLED', True)
+        self.backend = create_backend(app, app.config.get('DETAIL_CACHE_SIZE', 1024),
+                                      app.config.get('DETAIL_CACHE_TTL', 60))
+
+    def get_or_set(self, key, loader, version=None):
+        """Return the cached value of key, calling loader on a miss.
+        An entry built for another version is a miss. None is never cached,
+        so a missing entity is looked up every time."""
+        if not self.enabled:
+            return loader()
+        self.views[key] += 1
+        if pinned_to_primary():
+            # Entries may have been filled from a lagging replica by other
+            # clients; this one must see its own writes.
+            return loader()
+        stamp = version_stamp(version)
+        entry = self.backend.get(key)
+        if entry is not None and (stamp is None or entry[0] == stamp):
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self.backend.set(key, [stamp, value])
+        return value
+
+    def set(self, key, value, version=None):
+        self.backend.set(key, [version_stamp(version), value])
+
+    def invalidate(self, *keys):
+        self.backend.delete(*keys)
+
+    def most_viewed(self, count):
+        """The count most requested keys since the previous call."""
+        views, self.views = self.views, Counter()
+        return [key for key, _ in views.most_common(count)]
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.backend)
+        }
+
+
+detail_cache = DetailCache()
+
+
+#----------------------------------------------------------------------------#
+# Recent listings feed.
+#----------------------------------------------------------------------------#
+
+class RecentList(object):
+    """Bounded list of the most recently listed entities, newest first.
+
+    It is reloaded whenever the version of the rows it lists changes (their
+    ids and updated_at, see http_cache.feed_version), whichever process
+    wrote them; writes to other rows leave it alone.
+    """
+
+    def __init__(self, size=10):
+        self.size = size
+        self.items = None
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    def get(self, loader, version):
+        """Return the items, calling loader(size) to rebuild them on a miss
+        or when version differs from the one they were loaded for."""
+        stamp = version_stamp(version)
+        with self.lock:
+            if self.items is None or stamp != self.stamp:
+                self.items = loader(self.size)
+                self.stamp = stamp
+            return list(self.items)
+
+    def clear(self):
+        with self.lock:
+            self.items = None
+            self.stamp = None
+
+
+class RecentFeed(object):
+    """Recently listed venues and artists shown on the homepage."""
+
+    def __init__(self, app=None):
+        self.venues = RecentList()
+        self.artists = RecentList()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        size = app.config.get('RECENT_FEED_SIZE', 10)
+        self.venues = RecentList(size)
+        self.artists = RecentList(size)
+
+
+recent_feed = RecentFeed()
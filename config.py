@@ -1,5 +1,9 @@
 import os
-SECRET_KEY = os.urandom(32)
+# Signs the session cookie. Unset, each process makes up its own, which is
+# only fine for a single process; with SQLALCHEMY_REPLICA_URIS it is
+# required, since every process must read the read-your-writes window a
+# write left in the cookie.
+SECRET_KEY = None
 # Grabs the folder where the script runs.
 basedir = os.path.abspath(os.path.dirname(__file__))
 
@@ -12,3 +16,140 @@ DEBUG = True
 # TODO IMPLEMENT DATABASE URL
 SQLALCHEMY_DATABASE_URI = 'postgresql://user@localhost:5432/fyyur_app'
 SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+# Number of rows per page on the keyset-paginated listings (/artists, /shows).
+ARTISTS_PER_PAGE = 50
+SHOWS_PER_PAGE = 30
+
+# Past shows on a venue/artist page, newest first; older ones are behind a
+# "load more" link (/venues/<id>/past-shows).
+PAST_SHOWS_PER_PAGE = 10
+
+# Search backend: 'postgres' (tsvector + pg_trgm indexes), 'memory' (in-process
+# index, for SQLite) or 'auto' to pick from the database dialect.
+SEARCH_BACKEND = 'auto'
+SEARCH_RESULTS_PER_PAGE = 20
+
+# Read-through cache of the venue/artist detail pages. DETAIL_CACHE_BACKEND is
+# 'memory' (per-process LRU) or 'redis' (needs the redis package).
+DETAIL_CACHE_ENABLED = True
+DETAIL_CACHE_BACKEND = 'memory'
+DETAIL_CACHE_SIZE = 1024
+DETAIL_CACHE_TTL = 60
+DETAIL_CACHE_REDIS_URL = 'redis://localhost:6379/0'
+
+# Number of recently listed venues/artists kept in memory for the homepage.
+RECENT_FEED_SIZE = 10
+
+# Conditional GET (ETag/Last-Modified) on the read pages. Cache-Control can be
+# set per endpoint, e.g. {'show_venue': 'public, max-age=30'}.
+HTTP_CACHE_ENABLED = True
+HTTP_CACHE_CONTROL_DEFAULT = 'no-cache'
+HTTP_CACHE_CONTROL = {}
+
+# Rows loaded per query while streaming /api/v1 collections.
+API_STREAM_BATCH_SIZE = 500
+
+# Rows inserted per transaction by the bulk import (flask import-data and
+# POST /api/v1/import/<kind>).
+IMPORT_BATCH_SIZE = 1000
+# POST /api/v1/import/<kind> answers 404 unless the request sends a token
+# from `flask import-token` in IMPORT_HEADER; the token needs IMPORT_SECRET,
+# which must be the same in every process.
+IMPORT_SECRET = None
+IMPORT_HEADER = 'X-Fyyur-Import'
+IMPORT_TOKEN_MAX_AGE = 3600
+
+# Rows fetched per server-side cursor batch by the catalog export.
+EXPORT_BATCH_SIZE = 1000
+
+# Connection pool. Size workers so that workers * (DB_POOL_SIZE +
+# DB_MAX_OVERFLOW) stays below the server's max_connections; /metrics shows
+# checkouts and time spent waiting for a connection.
+DB_POOL_SIZE = 5
+DB_MAX_OVERFLOW = 10
+DB_POOL_TIMEOUT = 30
+DB_POOL_RECYCLE = 1800
+DB_POOL_PRE_PING = True
+# Abort statements running longer than this (PostgreSQL only, None to disable).
+DB_STATEMENT_TIMEOUT_MS = 30000
+# Behind PgBouncer in transaction pooling mode: no app side pooling and no
+# session level settings.
+DB_PGBOUNCER_MODE = False
+
+# Read replicas. The read pages and the GET API run on one of these, picked
+# per request; writes and everything else use SQLALCHEMY_DATABASE_URI. After a
+# client writes, its reads stay on the primary for
+# REPLICA_READ_YOUR_WRITES_SECONDS so replication lag cannot hide its change.
+SQLALCHEMY_REPLICA_URIS = []
+REPLICA_READ_YOUR_WRITES_SECONDS = 5
+
+# Request instrumentation: per endpoint histograms of wall time, SQL statements,
+# database and template time on /metrics. Requests over either threshold are
+# logged as warnings (None to disable a threshold).
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_QUERIES = 20
+
+# Logging. Records are written as JSON by a background thread, so requests never
+# wait on log I/O: to stderr, and outside debug mode also to the rotating
+# LOG_FILE. LOG_LEVELS sets per-logger levels, e.g. {'sqlalchemy.engine':
+# 'INFO'} logs every SQL statement.
+LOG_LEVEL = 'INFO'
+LOG_LEVELS = {
+    'werkzeug': 'INFO',
+    'sqlalchemy': 'WARNING',
+}
+LOG_FILE = 'error.log'
+LOG_FILE_LEVEL = 'INFO'
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUP_COUNT = 5
+
+# Opt-in profiling. With PROFILING_ENABLED every request runs under cProfile;
+# otherwise only requests sending a token from `flask profile-token` in
+# PROFILING_HEADER do (the token needs PROFILING_SECRET, which unlike
+# SECRET_KEY must be the same in every process). Profiles and SQL traces are
+# saved to PROFILING_DIR (the last PROFILING_HISTORY of them) and the slowest
+# are listed on /admin/profiles/, which always needs the token.
+PROFILING_ENABLED = False
+PROFILING_SECRET = None
+PROFILING_HEADER = 'X-Fyyur-Profile'
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_DIR = os.path.join(basedir, 'profiles')
+PROFILING_HISTORY = 200
+
+# The datetime template filter. With DATETIME_DISPLAY_TIMEZONE set (e.g.
+# 'America/New_York') times are converted to it, naive stored values being
+# taken as DATETIME_STORAGE_TIMEZONE; None renders them as stored.
+# start_time is stored as naive local time, so storage defaults to None, the
+# server's timezone; set it to 'UTC' once stored times are converted.
+DATETIME_DISPLAY_TIMEZONE = None
+DATETIME_STORAGE_TIMEZONE = None
+DATETIME_LOCALE = 'en'
+
+# Compiled templates are cached in this directory and shared by every worker
+# (None to compile in each process); `flask compile-templates` fills it.
+TEMPLATE_BYTECODE_CACHE_DIR = os.path.join(basedir, '.jinja_cache')
+
+# {% cache %} fragments (show tiles, venue area blocks), keyed by entity
+# version. Uses DETAIL_CACHE_BACKEND.
+FRAGMENT_CACHE_ENABLED = True
+FRAGMENT_CACHE_SIZE = 4096
+FRAGMENT_CACHE_TTL = 300
+
+# Background jobs (jobs.py). The 'thread' SCHEDULER_BACKEND runs them in every
+# serving process, starting with its first request; None disables it, e.g. to
+# run them from cron with `flask run-job <name>` instead. Intervals are in
+# seconds, 0 or None leaves a job to be run on demand.
+SCHEDULER_BACKEND = 'thread'
+SHOW_COUNTS_REFRESH_INTERVAL = 60
+CACHE_WARM_INTERVAL = 30
+CACHE_WARM_TOP = 50
+# Shows older than SHOW_ARCHIVE_AFTER_DAYS are moved to show_archive and drop
+# off the venue/artist pages; None keeps every show.
+SHOW_ARCHIVE_INTERVAL = 3600
+SHOW_ARCHIVE_AFTER_DAYS = None
+SHOW_ARCHIVE_BATCH_SIZE = 1000
+# On PostgreSQL show is partitioned by month of start_time; the partitions
+# for the next SHOW_PARTITIONS_AHEAD months are created in advance.
+SHOW_PARTITION_INTERVAL = 24 * 3600
+SHOW_PARTITIONS_AHEAD = 3
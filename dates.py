@@ -0,0 +1,89 @@
+import datetime
+from functools import lru_cache
+
+import babel
+import babel.dates
+import dateutil.parser
+from flask import current_app
+from flask.json import JSONEncoder as BaseJSONEncoder
+
+
+# Wire format of datetimes in the JSON API. Templates get native datetimes.
+JSON_FORMAT = '%m/%d/%Y, %H:%M:%S'
+
+# Shorthands accepted by the datetime filter; anything else is a babel pattern.
+NAMED_FORMATS = {
+    'full': "EEEE MMMM, d, y 'at' h:mma",
+    'medium': "EE MM, dd, y h:mma",
+}
+
+
+#----------------------------------------------------------------------------#
+# Formatting.
+#----------------------------------------------------------------------------#
+
+@lru_cache(maxsize=None)
+def compiled_pattern(format):
+    return babel.dates.parse_pattern(NAMED_FORMATS.get(format, format))
+
+
+@lru_cache(maxsize=None)
+def get_locale(identifier):
+    return babel.Locale.parse(identifier)
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name):
+    return babel.dates.get_timezone(name)
+
+
+def to_datetime(value):
+    """value as a datetime. Strings are still accepted, the JSON format first
+    since it can be parsed without guessing."""
+    if isinstance(value, datetime.datetime):
+        return value
+    try:
+        return datetime.datetime.strptime(value, JSON_FORMAT)
+    except ValueError:
+        return dateutil.parser.parse(value)
+
+
+def to_timezone(value, name, storage_name):
+    """value converted to the named timezone; naive values are taken to be
+    in storage_name, or in the server's timezone when it is None."""
+    if value.tzinfo is None and storage_name is None:
+        value = value.astimezone()
+    elif value.tzinfo is None:
+        storage = get_timezone(storage_name)
+        # pytz timezones must localize; zoneinfo ones are simply attached.
+        value = storage.localize(value) if hasattr(storage, 'localize') else value.replace(tzinfo=storage)
+    return value.astimezone(get_timezone(name))
+
+
+def format_datetime(value, format='medium', tz=None, locale=None):
+    """The datetime template filter.
+
+    Patterns and locales are parsed once and reused. Values are rendered in
+    tz, or DATETIME_DISPLAY_TIMEZONE, when either is set, and as stored
+    otherwise.
+    """
+    config = current_app.config
+    value = to_datetime(value)
+    tz = tz or config.get('DATETIME_DISPLAY_TIMEZONE')
+    if tz:
+        value = to_timezone(value, tz, config.get('DATETIME_STORAGE_TIMEZONE'))
+    return compiled_pattern(format).apply(value, get_locale(locale or config.get('DATETIME_LOCALE', 'en')))
+
+
+#----------------------------------------------------------------------------#
+# JSON.
+#----------------------------------------------------------------------------#
+
+class JSONEncoder(BaseJSONEncoder):
+    """Flask's encoder with datetimes in JSON_FORMAT, the format the API has
+    always used, instead of HTTP dates."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.strftime(JSON_FORMAT)
+        return super(JSONEncoder, self).default(o)
@@ -0,0 +1,162 @@
+import csv
+import datetime
+import io
+import json
+
+from models import db, Venue, Artist, Show, Genre, venue_genre, artist_genre
+
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+def genre_names(link_table, link_column, owner_id):
+    """Correlated subquery returning an entity's genres as one comma separated
+    string, so the export stays one row per entity."""
+    if db.engine.dialect.name == 'postgresql':
+        aggregate = db.func.string_agg(Genre.name, ',', type_=db.String)
+    else:
+        aggregate = db.func.group_concat(Genre.name, ',', type_=db.String)
+    return db.select([aggregate]).\
+        select_from(link_table.join(Genre, Genre.id == link_table.c.genre_id)).\
+        where(link_column == owner_id).\
+        as_scalar()
+
+
+def venues_query():
+    return db.session.query(
+        Venue.id, Venue.name, Venue.city, Venue.state, Venue.address, Venue.phone,
+        Venue.image_link, Venue.facebook_link, Venue.website, Venue.seeking_talent,
+        Venue.seeking_description,
+        genre_names(venue_genre, venue_genre.c.venue_id, Venue.id).label('genres')
+    ).order_by(Venue.id)
+
+
+def artists_query():
+    return db.session.query(
+        Artist.id, Artist.name, Artist.city, Artist.state, Artist.phone,
+        Artist.image_link, Artist.facebook_link, Artist.website, Artist.seeking_venue,
+        Artist.seeking_description,
+        genre_names(artist_genre, artist_genre.c.artist_id, Artist.id).label('genres')
+    ).order_by(Artist.id)
+
+
+def shows_query():
+    # Venue and artist names come from the same join instead of one lookup
+    # per show.
+    return db.session.query(
+        Show.id, Show.start_time,
+        Show.venue_id, Venue.name.label('venue_name'),
+        Show.artist_id, Artist.name.label('artist_name')
+    ).join(Venue, Venue.id == Show.venue_id).\
+        join(Artist, Artist.id == Show.artist_id).\
+        order_by(Show.id)
+
+
+EXPORTS = {
+    'venues': venues_query,
+    'artists': artists_query,
+    'shows': shows_query,
+}
+
+
+def export_rows(kind, batch_size=1000):
+    """Return (column names, row iterator) for kind.
+
+    Rows are fetched through a server-side cursor (a named cursor on
+    psycopg2) batch_size at a time, so memory does not grow with the table.
+    """
+    query = EXPORTS[kind]()
+    columns = [column['name'] for column in query.column_descriptions]
+    rows = query.execution_options(stream_results=True).yield_per(batch_size)
+    return columns, rows
+
+
+def export_types(kind):
+    """SQLAlchemy types of the columns export_rows returns for kind."""
+    return [column['type'] for column in EXPORTS[kind]().column_descriptions]
+
+
+#----------------------------------------------------------------------------#
+# Formats.
+#----------------------------------------------------------------------------#
+
+def plain(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def csv_chunks(columns, rows, batch_size=1000):
+    """Yield the CSV text batch_size rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for index, row in enumerate(rows, 1):
+        writer.writerow([plain(value) for value in row])
+        if index % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_chunks(columns, rows, batch_size=1000):
+    """Yield one JSON object per line, batch_size lines at a time."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, (plain(value) for value in row)))) + '\n')
+        if len(lines) == batch_size:
+            yield ''.join(lines)
+            lines = []
+    yield ''.join(lines)
+
+
+def arrow_type(pyarrow, sql_type):
+    if isinstance(sql_type, db.Boolean):
+        return pyarrow.bool_()
+    if isinstance(sql_type, db.Integer):
+        return pyarrow.int64()
+    if isinstance(sql_type, db.DateTime):
+        return pyarrow.timestamp('us')
+    if isinstance(sql_type, db.String):
+        return pyarrow.string()
+    raise ValueError('No Parquet type for {!r}'.format(sql_type))
+
+
+def write_parquet(columns, types, rows, path, batch_size=1000):
+    """Write rows to a Parquet file, one row group per batch. Needs pyarrow.
+
+    The schema comes from the column types (see export_types) rather than
+    from the first batch, where a column with only NULLs would be typed
+    null and the next batch would not match it.
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError('Parquet export needs the pyarrow package.')
+
+    schema = pyarrow.schema([(column, arrow_type(pyarrow, sql_type)) for column, sql_type in zip(columns, types)])
+    writer = pyarrow.parquet.ParquetWriter(path, schema)
+    batch = []
+
+    def write(batch):
+        writer.write_table(pyarrow.Table.from_pydict({
+            column: [row[index] for row in batch] for index, column in enumerate(columns)
+        }, schema=schema))
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            write(batch)
+            batch = []
+    if batch:
+        write(batch)
+    writer.close()
+
+
+CHUNKERS = {
+    'csv': csv_chunks,
+    'jsonl': jsonl_chunks,
+}
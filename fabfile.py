@@ -1,14 +1,24 @@
+import os
+
 from fabric.api import local, settings, abort
 from fabric.contrib.console import confirm
 
+BENCHMARK_BASELINE = 'benchmark-baseline.json'
+
 # prepare for deployment
 
 
 def test():
+    # Latencies depend on the machine, so the baseline is recorded locally
+    # by the first run rather than committed; later runs compare against it.
+    if os.path.exists(BENCHMARK_BASELINE):
+        benchmark = "--baseline {} --output benchmark-results.json".format(BENCHMARK_BASELINE)
+    else:
+        benchmark = "--output {}".format(BENCHMARK_BASELINE)
     with settings(warn_only=True):
-        result = local(
-            "python test_tasks.py -v && python test_users.py -v", capture=True
-        )
+        result = local("python -m pytest -q tests", capture=True)
+        if result.succeeded:
+            result = local("FLASK_APP=app.py flask benchmark " + benchmark, capture=True)
     if result.failed and not confirm("Tests failed. Continue?"):
         abort("Aborted at user request.")
 
@@ -39,9 +49,7 @@ def heroku():
 
 
 def heroku_test():
-    local(
-        "heroku run python test_tasks.py -v && heroku run python test_users.py -v"
-    )
+    local("heroku run FLASK_APP=app.py flask check-indexes")
 
 
 def deploy():
@@ -81,11 +81,11 @@ states_choices = [
 ]
 
 def validate_genre(form, field):
-    if field.data not in genres_choices:
+    if any(genre not in dict(genres_choices) for genre in field.data):
         raise ValidationError("Invalid genre choice")
 
 def validate_state(form, field):
-    if field.data not in states_choices:
+    if field.data not in dict(states_choices):
         raise ValidationError("Invalid state choice")
 
 class ShowForm(FlaskForm):
@@ -98,7 +98,7 @@ class ShowForm(FlaskForm):
     start_time = DateTimeField(
         'start_time',
         validators=[DataRequired()],
-        default= datetime.today()
+        default= datetime.today
     )
 
 class VenueForm(FlaskForm):
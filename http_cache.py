@@ -0,0 +1,119 @@
+import datetime
+import hashlib
+import itertools
+from functools import wraps
+
+from flask import current_app, g, request, session, make_response
+
+from models import db, Venue, Artist, Show, TableVersion
+
+
+#----------------------------------------------------------------------------#
+# Versions.
+#----------------------------------------------------------------------------#
+
+# A version is a tuple of values that changes whenever the rendered page
+# would. Listing pages use the table versions, which every write bumps (see
+# TableVersion); a detail page aggregates the few rows it shows, and the
+# number of its upcoming shows changes as shows start.
+
+def feed_version(model, size):
+    """ids and updated_at of the size newest rows of model, which the
+    homepage feed lists, read off the primary key index."""
+    rows = db.session.query(model.id, model.updated_at).order_by(model.id.desc()).limit(size)
+    return tuple(itertools.chain.from_iterable(rows))
+
+
+def index_version(now):
+    # The homepage only shows the feed. The view reuses both halves.
+    size = current_app.config.get('RECENT_FEED_SIZE', 10)
+    g.feed_versions = feed_version(Venue, size), feed_version(Artist, size)
+    return g.feed_versions[0] + g.feed_versions[1]
+
+
+def venues_version(now):
+    # The listing reads the venues' show counters, whose updates bump it.
+    return TableVersion.versions('venue')
+
+
+def artists_version(now):
+    return TableVersion.versions('artist')
+
+
+def shows_version(now):
+    return TableVersion.versions('show', 'venue', 'artist')
+
+
+def entity_version(model, foreign_key, other, other_key, entity_id, now):
+    """Version of one venue/artist page: the entity, its shows and the
+    entities on the other side of those shows. None if it does not exist."""
+    return db.session.query(
+        model.updated_at,
+        db.func.count(Show.id),
+        db.func.max(Show.updated_at),
+        db.func.count(Show.id).filter(Show.start_time >= now),
+        db.func.max(other.updated_at)
+    ).outerjoin(Show, foreign_key == model.id).\
+        outerjoin(other, other.id == other_key).\
+        filter(model.id == entity_id).\
+        group_by(model.id, model.updated_at).first()
+
+
+def venue_version(now, venue_id):
+    return entity_version(Venue, Show.venue_id, Artist, Show.artist_id, venue_id, now)
+
+
+def artist_version(now, artist_id):
+    return entity_version(Artist, Show.artist_id, Venue, Show.venue_id, artist_id, now)
+
+
+#----------------------------------------------------------------------------#
+# Conditional responses.
+#----------------------------------------------------------------------------#
+
+def cache_control_for(endpoint):
+    per_route = current_app.config.get('HTTP_CACHE_CONTROL', {})
+    return per_route.get(endpoint, current_app.config.get('HTTP_CACHE_CONTROL_DEFAULT', 'no-cache'))
+
+
+def conditional(version):
+    """Answer GETs of the decorated view with 304 Not Modified, without
+    running it, when the client's validators match the current version.
+
+    version(now, **view_args) returns the version tuple of the page, or None
+    when the page does not exist (the view then runs and 404s as usual). It
+    is left in g.page_version for the view.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**view_args):
+            if not current_app.config.get('HTTP_CACHE_ENABLED', True) or '_flashes' in session:
+                # Pages carrying flashed messages are one-off.
+                return view(**view_args)
+
+            current = version(datetime.datetime.now(), **view_args)
+            if current is None:
+                return view(**view_args)
+            # Views serving from a process cache check their entry against it.
+            g.page_version = current
+
+            etag = hashlib.sha1(repr((request.full_path, tuple(current))).encode('utf-8')).hexdigest()
+            timestamps = [value for value in current if isinstance(value, datetime.datetime)]
+            last_modified = max(timestamps).replace(microsecond=0) if timestamps else None
+
+            # If-Modified-Since is only trusted when no ETag is sent: a delete
+            # changes the version but not the newest updated_at.
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since and
+                                    last_modified <= request.if_modified_since)
+
+            response = make_response('', 304) if not_modified else make_response(view(**view_args))
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control_for(request.endpoint)
+            return response
+        return wrapper
+    return decorator
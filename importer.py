@@ -0,0 +1,244 @@
+import csv
+import io
+import json
+
+from flask import current_app
+from sqlalchemy import text
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+from wtforms.fields.core import UnboundField
+
+from forms import VenueForm, ArtistForm, ShowForm
+from models import db, Venue, Artist, Show, Genre, TableVersion, venue_genre, artist_genre
+from cache import detail_cache
+import search
+
+
+#----------------------------------------------------------------------------#
+# Parsing.
+#----------------------------------------------------------------------------#
+
+def read_rows(stream, format):
+    """Yield (line number, row dict) from a CSV or JSONL text stream without
+    reading it into memory. Lines that cannot be parsed yield a None row."""
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        raise ValueError('Unknown import format {!r}, expected csv or jsonl'.format(format))
+
+
+def text_stream(binary_stream):
+    return io.TextIOWrapper(binary_stream, encoding='utf-8', newline='')
+
+
+# How exports and spreadsheets spell an unchecked box. A BooleanField would
+# take any non-empty string, "False" included, as checked.
+FALSE_STRINGS = {'false', '0', 'no', 'off'}
+
+
+def boolean_fields(form_class):
+    return {name for name in dir(form_class)
+            if isinstance(getattr(form_class, name), UnboundField)
+            and issubclass(getattr(form_class, name).field_class, BooleanField)}
+
+
+def to_formdata(row, booleans=()):
+    """Turn a parsed row into the formdata the forms would get from a POST.
+    Empty values are left out, and so are false values of the booleans."""
+    formdata = MultiDict()
+    for key, value in row.items():
+        if isinstance(value, str):
+            value = value.strip()
+            if key in booleans and value.lower() in FALSE_STRINGS:
+                value = False
+        if value is None or value is False or value == '':
+            continue
+        if key == 'genres' and isinstance(value, str):
+            value = [genre.strip() for genre in value.split(',') if genre.strip()]
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                formdata.add(key, item)
+        elif value is True:
+            formdata.add(key, 'y')
+        else:
+            formdata.add(key, str(value))
+    return formdata
+
+
+def reserve_ids(model, count):
+    """count new primary keys for model. On PostgreSQL they are taken from
+    its sequence in one statement; elsewhere (SQLite) they follow the
+    current maximum, so a concurrent insert fails the batch instead."""
+    table = model.__table__.name
+    if db.session.get_bind(model.__mapper__).dialect.name == 'postgresql':
+        rows = db.session.execute(text(
+            "SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"
+        ), {'table': table, 'count': count})
+        return [row[0] for row in rows]
+    start = db.session.query(db.func.coalesce(db.func.max(model.id), 0)).scalar() + 1
+    return list(range(start, start + count))
+
+
+#----------------------------------------------------------------------------#
+# Importers.
+#----------------------------------------------------------------------------#
+
+class EntityImporter(object):
+    """Validates venue/artist rows with their form and inserts them, with
+    their genre links, one batch at a time."""
+
+    def __init__(self, form_class, model, link_table, link_column):
+        self.form_class = form_class
+        self.model = model
+        self.link_table = link_table
+        self.link_column = link_column
+        self.booleans = boolean_fields(form_class)
+
+    def validate(self, row):
+        form = self.form_class(formdata=to_formdata(row, self.booleans), meta={'csrf': False})
+        if not form.validate():
+            return None, form.errors
+        data = dict(form.data)
+        data.pop('csrf_token', None)
+        return data, None
+
+    def insert(self, rows):
+        genres = [data.pop('genres') for data in rows]
+        # The ids are reserved up front for the genre links, so the rows go in
+        # one executemany (return_defaults would insert them one by one).
+        for data, entity_id in zip(rows, reserve_ids(self.model, len(rows))):
+            data['id'] = entity_id
+        db.session.bulk_insert_mappings(self.model, rows)
+
+        genre_ids = {}
+        names = set(name for names in genres for name in names)
+        if names:
+            genre_objects = Genre.get_or_create_all(sorted(names))
+            db.session.add_all(genre_objects)
+            db.session.flush()
+            genre_ids = {genre.name: genre.id for genre in genre_objects}
+        links = [
+            {self.link_column: data['id'], 'genre_id': genre_ids[name]}
+            for data, names in zip(rows, genres) for name in set(names)
+        ]
+        if links:
+            db.session.execute(self.link_table.insert(), links)
+
+
+class ShowImporter(object):
+    """Validates show rows with ShowForm plus foreign key checks and bulk
+    inserts them."""
+
+    model = Show
+
+    def validate(self, row):
+        form = ShowForm(formdata=to_formdata(row), meta={'csrf': False})
+        errors = {} if form.validate() else dict(form.errors)
+        if not form.start_time.raw_data:
+            # ShowForm's default (now) would otherwise stand in for it.
+            errors['start_time'] = ['This field is required.']
+        data = {'start_time': form.start_time.data}
+        for field in ('artist_id', 'venue_id'):
+            try:
+                data[field] = int(getattr(form, field).data)
+            except (TypeError, ValueError):
+                errors[field] = ['Not a valid id.']
+        if errors:
+            return None, errors
+        return data, None
+
+    def check_references(self, rows):
+        """Errors for rows pointing at venues or artists that do not exist,
+        checked with one query per table for the whole batch."""
+        venue_ids = set(venue_id for venue_id, in db.session.query(Venue.id).filter(
+            Venue.id.in_(set(data['venue_id'] for line, data in rows))))
+        artist_ids = set(artist_id for artist_id, in db.session.query(Artist.id).filter(
+            Artist.id.in_(set(data['artist_id'] for line, data in rows))))
+        errors = {}
+        for line, data in rows:
+            if data['venue_id'] not in venue_ids:
+                errors.setdefault(line, {})['venue_id'] = ['Venue does not exist.']
+            if data['artist_id'] not in artist_ids:
+                errors.setdefault(line, {})['artist_id'] = ['Artist does not exist.']
+        return errors
+
+    def insert(self, rows):
+        db.session.bulk_insert_mappings(Show, rows)
+        # Bulk inserts skip Show.add, so the batch's venues and artists are
+        # recounted here, in the same transaction.
+        Show.refresh_counts(venue_ids={data['venue_id'] for data in rows},
+                            artist_ids={data['artist_id'] for data in rows})
+
+
+IMPORTERS = {
+    'venues': EntityImporter(VenueForm, Venue, venue_genre, 'venue_id'),
+    'artists': EntityImporter(ArtistForm, Artist, artist_genre, 'artist_id'),
+    'shows': ShowImporter(),
+}
+
+
+def import_rows(kind, rows, batch_size=1000):
+    """Validate and insert (line number, row) pairs of the given kind
+    ('venues', 'artists' or 'shows').
+
+    Valid rows are inserted batch_size at a time, one transaction per
+    batch. Returns {'inserted': count, 'errors': [{'line', 'errors'}]}.
+    """
+    importer = IMPORTERS[kind]
+    result = {'inserted': 0, 'errors': []}
+
+    def flush(batch):
+        if not batch:
+            return
+        if hasattr(importer, 'check_references'):
+            invalid = importer.check_references(batch)
+            for line in sorted(invalid):
+                result['errors'].append({'line': line, 'errors': invalid[line]})
+            batch = [(line, data) for line, data in batch if line not in invalid]
+            if not batch:
+                return
+        try:
+            importer.insert([data for line, data in batch])
+            # Bulk inserts skip the flush that bumps it.
+            TableVersion.bump(db.session, [importer.model.__tablename__])
+            db.session.commit()
+            result['inserted'] += len(batch)
+        except Exception:
+            db.session.rollback()
+            # The database's message may describe the schema; it goes to the
+            # log, not to the client.
+            current_app.logger.exception('Import of %s lines %s-%s failed', kind, batch[0][0], batch[-1][0])
+            for line, data in batch:
+                result['errors'].append({'line': line, 'errors': {'database': ['The batch could not be inserted.']}})
+
+    batch = []
+    for line, row in rows:
+        if row is None:
+            result['errors'].append({'line': line, 'errors': {'row': ['Malformed row.']}})
+            continue
+        data, errors = importer.validate(row)
+        if errors:
+            result['errors'].append({'line': line, 'errors': errors})
+            continue
+        batch.append((line, data))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    flush(batch)
+
+    # Bulk inserts bypass the models' CRUD methods and ORM events.
+    if result['inserted']:
+        detail_cache.clear()
+        search.invalidate()
+    return result
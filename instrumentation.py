@@ -0,0 +1,183 @@
+import threading
+import time
+
+import jinja2
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+#----------------------------------------------------------------------------#
+# Histograms.
+#----------------------------------------------------------------------------#
+
+class Histogram(object):
+    """Prometheus style cumulative histogram with one series per label value."""
+
+    def __init__(self, name, description, buckets, label='endpoint'):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label = label
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.description),
+            '# TYPE {} histogram'.format(self.name),
+        ]
+        with self.lock:
+            for label_value, series in sorted(self.series.items()):
+                label = '{}="{}"'.format(self.label, label_value)
+                for bound, count in zip(self.buckets, series['buckets']):
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(self.name, label, bound, count))
+                lines.append('{}_bucket{{{},le="+Inf"}} {}'.format(self.name, label, series['count']))
+                lines.append('{}_sum{{{}}} {:.6f}'.format(self.name, label, series['sum']))
+                lines.append('{}_count{{{}}} {}'.format(self.name, label, series['count']))
+        return lines
+
+    def reset(self):
+        with self.lock:
+            self.series = {}
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+#----------------------------------------------------------------------------#
+# Request instrumentation.
+#----------------------------------------------------------------------------#
+
+class RequestMetrics(object):
+    """Per endpoint histograms of wall time, SQL statement count, time spent
+    in the database and time spent rendering templates.
+
+    Requests over SLOW_REQUEST_MS or SLOW_REQUEST_QUERIES are logged as
+    warnings. Measurements stop when the view returns, so the body of a
+    streamed response is not included.
+    """
+
+    def __init__(self, app=None):
+        self.duration = Histogram('fyyur_request_duration_seconds', 'Wall time per request.', SECONDS_BUCKETS)
+        self.queries = Histogram('fyyur_request_queries', 'SQL statements per request.', QUERY_BUCKETS)
+        self.db_time = Histogram('fyyur_request_db_seconds', 'Time spent in SQL statements per request.', SECONDS_BUCKETS)
+        self.template_time = Histogram('fyyur_request_template_seconds', 'Template render time per request.', SECONDS_BUCKETS)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.jinja_env.template_class = TimedTemplate
+        app.before_request(self.start)
+
+        @app.after_request
+        def finish(response):
+            self.finish(app, response)
+            return response
+
+    def start(self):
+        g.request_stats = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_seconds': 0.0,
+            'template_seconds': 0.0,
+        }
+
+    def finish(self, app, response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return
+        wall = time.perf_counter() - stats['started']
+        endpoint = request.endpoint or 'unmatched'
+        self.duration.observe(endpoint, wall)
+        self.queries.observe(endpoint, stats['queries'])
+        self.db_time.observe(endpoint, stats['db_seconds'])
+        self.template_time.observe(endpoint, stats['template_seconds'])
+
+        slow_ms = app.config.get('SLOW_REQUEST_MS')
+        slow_queries = app.config.get('SLOW_REQUEST_QUERIES')
+        if (slow_ms is not None and wall * 1000 > slow_ms) or \
+                (slow_queries is not None and stats['queries'] > slow_queries):
+            app.logger.warning(
+                'Slow request %s %s (%s) %d: %.1fms wall, %d queries, %.1fms db, %.1fms templates',
+                request.method, request.full_path, endpoint, response.status_code, wall * 1000,
+                stats['queries'], stats['db_seconds'] * 1000, stats['template_seconds'] * 1000,
+                extra={
+                    'endpoint': endpoint,
+                    'status': response.status_code,
+                    'wall_ms': round(wall * 1000, 1),
+                    'queries': stats['queries'],
+                    'db_ms': round(stats['db_seconds'] * 1000, 1),
+                    'template_ms': round(stats['template_seconds'] * 1000, 1),
+                })
+
+    def render(self):
+        lines = []
+        for histogram in (self.duration, self.queries, self.db_time, self.template_time):
+            lines += histogram.render()
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for histogram in (self.duration, self.queries, self.db_time, self.template_time):
+            histogram.reset()
+
+
+def current_stats():
+    if has_request_context():
+        return g.get('request_stats')
+    return None
+
+
+class TimedTemplate(jinja2.Template):
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super(TimedTemplate, self).render(*args, **kwargs)
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                stats['template_seconds'] += time.perf_counter() - started
+
+
+# Every engine, the primary and the replicas alike.
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    stats = current_stats()
+    if stats is not None:
+        seconds = time.perf_counter() - started
+        stats['queries'] += 1
+        stats['db_seconds'] += seconds
+        # Filled in for requests run under the profiler (profiling.py).
+        trace = g.get('sql_trace')
+        if trace is not None:
+            trace.append({'statement': statement, 'parameters': parameters, 'seconds': seconds})
+
+
+@event.listens_for(Engine, 'handle_error')
+def discard_failed_query(context):
+    # after_cursor_execute does not run for a failed statement.
+    if context.connection is not None and context.cursor is not None:
+        started = context.connection.info.get('query_started')
+        if started:
+            started.pop()
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,87 @@
+import datetime
+
+from flask import current_app
+
+from cache import detail_cache
+import http_cache
+from models import db, Artist, Venue, Show, ShowArchive
+from partitions import add_months, ensure_partitions, month_start
+
+
+#----------------------------------------------------------------------------#
+# Jobs.
+#----------------------------------------------------------------------------#
+
+class RefreshShowCounts(object):
+    """Re-bucket the upcoming/past counters of venues and artists whose shows
+    started since the previous run (everything on the first run)."""
+
+    def __init__(self):
+        self.last_run = None
+
+    def __call__(self):
+        now = datetime.datetime.now()
+        changed = Show.refresh_counts(now=now, since=self.last_run)
+        db.session.commit()
+        self.last_run = now
+        return changed
+
+
+DETAIL_LOADERS = {
+    'venue': lambda entity_id: Venue.query.filter(Venue.id == entity_id).one_or_none(),
+    'artist': lambda entity_id: Artist.query.filter(Artist.id == entity_id).one_or_none(),
+}
+
+DETAIL_VERSIONS = {
+    'venue': http_cache.venue_version,
+    'artist': http_cache.artist_version,
+}
+
+
+def warm_detail_cache():
+    """Reload the most viewed venue/artist pages since the previous run, so
+    they stay cached and their upcoming/past split stays current."""
+    if not detail_cache.enabled:
+        return 0
+    warmed = 0
+    for key in detail_cache.most_viewed(current_app.config.get('CACHE_WARM_TOP', 50)):
+        kind, _, entity_id = key.partition(':')
+        # Stamped with the version the page will ask for (see http_cache).
+        version = DETAIL_VERSIONS[kind](datetime.datetime.now(), int(entity_id))
+        entity = DETAIL_LOADERS[kind](int(entity_id))
+        if entity is None or version is None:
+            continue
+        details = entity.get_venue_with_show_details if kind == 'venue' else entity.get_artist_with_show_details
+        detail_cache.set(key, details, version)
+        warmed += 1
+    return warmed
+
+
+def archive_old_shows():
+    """Move shows older than SHOW_ARCHIVE_AFTER_DAYS into show_archive."""
+    days = current_app.config.get('SHOW_ARCHIVE_AFTER_DAYS')
+    if not days:
+        return 0
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=days)
+    return ShowArchive.archive_before(cutoff, current_app.config.get('SHOW_ARCHIVE_BATCH_SIZE', 1000))
+
+
+def create_show_partitions():
+    """Create the monthly show partitions through SHOW_PARTITIONS_AHEAD
+    months from now (PostgreSQL only)."""
+    now = datetime.datetime.now()
+    ahead = add_months(month_start(now), current_app.config.get('SHOW_PARTITIONS_AHEAD', 3))
+    created = ensure_partitions(db.session.connection(), now, ahead)
+    db.session.commit()
+    return created
+
+
+#----------------------------------------------------------------------------#
+# Registration.
+#----------------------------------------------------------------------------#
+
+def register(scheduler, config):
+    scheduler.add_job('refresh-show-counts', RefreshShowCounts(), config.get('SHOW_COUNTS_REFRESH_INTERVAL', 60))
+    scheduler.add_job('warm-detail-cache', warm_detail_cache, config.get('CACHE_WARM_INTERVAL', 30))
+    scheduler.add_job('archive-old-shows', archive_old_shows, config.get('SHOW_ARCHIVE_INTERVAL', 3600))
+    scheduler.add_job('create-show-partitions', create_show_partitions, config.get('SHOW_PARTITION_INTERVAL', 86400))
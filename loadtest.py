@@ -0,0 +1,67 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+#----------------------------------------------------------------------------#
+# Load test.
+#----------------------------------------------------------------------------#
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def run(url, concurrency=50, requests=1000, timeout=30):
+    """GET url requests times from concurrency client threads and return
+    throughput and latency figures."""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def one(_):
+        ok, latency = fetch(url, timeout)
+        with lock:
+            if ok:
+                latencies.append(latency)
+            else:
+                errors[0] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'requests': requests,
+        'errors': errors[0],
+        'seconds': elapsed,
+        # Failed requests are often the fastest; only successes count.
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def format_result(result):
+    return ('{url}  c={concurrency} n={requests} errors={errors}  '
+            '{requests_per_second:.1f} req/s  p50={p50_ms:.1f}ms '
+            'p95={p95_ms:.1f}ms p99={p99_ms:.1f}ms').format(**result)
@@ -0,0 +1,93 @@
+import atexit
+import copy
+import datetime
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask.logging import default_handler
+
+
+#----------------------------------------------------------------------------#
+# Formatting.
+#----------------------------------------------------------------------------#
+
+# Attributes every LogRecord has; anything else was passed through extra=.
+RECORD_ATTRIBUTES = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record, with the fields passed through extra=
+    alongside the standard ones."""
+
+    def format(self, record):
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'module': record.module,
+            'line': record.lineno,
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                data[key] = value
+        return json.dumps(data, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps the extra fields of a record and formats the
+    traceback in the logging thread, leaving the JSON to the listener."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+#----------------------------------------------------------------------------#
+# Setup.
+#----------------------------------------------------------------------------#
+
+def init_app(app):
+    """Send every log record through a queue to a background thread that
+    writes it, as JSON, to stderr and (outside debug mode) to a rotating
+    LOG_FILE. Loggers get their levels from LOG_LEVEL and LOG_LEVELS."""
+    formatter = JSONFormatter()
+    handlers = [logging.StreamHandler()]
+    if not app.debug and app.config.get('LOG_FILE'):
+        file_handler = RotatingFileHandler(
+            app.config['LOG_FILE'],
+            maxBytes=app.config.get('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('LOG_FILE_BACKUP_COUNT', 5)
+        )
+        file_handler.setLevel(app.config.get('LOG_FILE_LEVEL', 'INFO'))
+        handlers.append(file_handler)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.Queue(-1)
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(StructuredQueueHandler(records))
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+
+    # Flask's own stderr handler would write synchronously, and twice.
+    app.logger.removeHandler(default_handler)
+    for name, level in app.config.get('LOG_LEVELS', {}).items():
+        logging.getLogger(name).setLevel(level)
+    return listener
@@ -0,0 +1,36 @@
+"""table versions
+
+Revision ID: 3c5b8e0f7a12
+Revises: 7c4e2a9d1f30
+Create Date: 2026-10-18 14:02:17.350912
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5b8e0f7a12'
+down_revision = '7c4e2a9d1f30'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venue', 'artist', 'show')
+
+
+def upgrade():
+    table_version = op.create_table('table_version',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    now = datetime.datetime.utcnow()
+    op.bulk_insert(table_version, [{'name': name, 'version': 0, 'updated_at': now} for name in TABLES])
+
+
+def downgrade():
+    op.drop_table('table_version')
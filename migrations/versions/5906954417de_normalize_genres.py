@@ -0,0 +1,120 @@
+"""normalize genres
+
+Revision ID: 5906954417de
+Revises: eec96c3bc4ed
+Create Date: 2026-10-18 11:50:16.767002
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5906954417de'
+down_revision = 'eec96c3bc4ed'
+branch_labels = None
+depends_on = None
+
+
+# The search_vector generated column of the full text search migration reads
+# the CSV genres column, so it is rebuilt over name and location only.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B')"
+)
+
+CSV_SEARCH_VECTOR = SEARCH_VECTOR + (
+    " || setweight(to_tsvector('simple', replace(coalesce(genres, ''), ',', ' ')), 'C')"
+)
+
+OWNERS = (('venue', 'venue_genre', 'venue_id'), ('artist', 'artist_genre', 'artist_id'))
+
+
+def set_search_vector(table, expression):
+    op.execute('DROP INDEX IF EXISTS ix_{0}_search_vector'.format(table))
+    op.execute('ALTER TABLE {0} DROP COLUMN IF EXISTS search_vector'.format(table))
+    op.execute(
+        'ALTER TABLE {0} ADD COLUMN search_vector tsvector '
+        'GENERATED ALWAYS AS ({1}) STORED'.format(table, expression)
+    )
+    op.execute('CREATE INDEX ix_{0}_search_vector ON {0} USING gin (search_vector)'.format(table))
+
+
+def upgrade():
+    bind = op.get_bind()
+    genre = op.create_table('genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    links = {}
+    for table, link_table, owner_id in OWNERS:
+        links[table] = op.create_table(link_table,
+        sa.Column(owner_id, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint([owner_id], ['{}.id'.format(table)], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['genre.id'], ),
+        sa.PrimaryKeyConstraint(owner_id, 'genre_id')
+        )
+        op.create_index(op.f('ix_{}_genre_id'.format(link_table)), link_table, ['genre_id'], unique=False)
+
+    # Split the comma separated genres into genre rows and links.
+    rows = {}
+    names = set()
+    for table, link_table, owner_id in OWNERS:
+        rows[table] = []
+        for owner, genres in bind.execute(sa.text('SELECT id, genres FROM {}'.format(table))):
+            owner_genres = set(name.strip() for name in (genres or '').split(',') if name.strip())
+            rows[table].append((owner, owner_genres))
+            names.update(owner_genres)
+
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in sorted(names)])
+    genre_ids = dict((name, genre_id) for genre_id, name in bind.execute(sa.text('SELECT id, name FROM genre')))
+    for table, link_table, owner_id in OWNERS:
+        link_rows = [
+            {owner_id: owner, 'genre_id': genre_ids[name]}
+            for owner, owner_genres in rows[table] for name in owner_genres
+        ]
+        if link_rows:
+            op.bulk_insert(links[table], link_rows)
+
+    if bind.dialect.name == 'postgresql':
+        for table, link_table, owner_id in OWNERS:
+            set_search_vector(table, SEARCH_VECTOR)
+
+    for table, link_table, owner_id in OWNERS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('genres')
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('venue') as batch_op:
+        batch_op.add_column(sa.Column('genres', sa.String(), nullable=True))
+    with op.batch_alter_table('artist') as batch_op:
+        batch_op.add_column(sa.Column('genres', sa.String(length=120), nullable=True))
+
+    # Fold the links back into comma separated strings.
+    for table, link_table, owner_id in OWNERS:
+        genres = {}
+        links = bind.execute(sa.text(
+            'SELECT l.{1}, g.name FROM {0} l JOIN genre g ON g.id = l.genre_id ORDER BY g.name'.format(link_table, owner_id)
+        ))
+        for owner, name in links:
+            genres.setdefault(owner, []).append(name)
+        for owner, names in genres.items():
+            bind.execute(
+                sa.text('UPDATE {} SET genres = :genres WHERE id = :id'.format(table)),
+                genres=','.join(names), id=owner
+            )
+
+    if bind.dialect.name == 'postgresql':
+        for table, link_table, owner_id in OWNERS:
+            set_search_vector(table, CSV_SEARCH_VECTOR)
+
+    for table, link_table, owner_id in OWNERS:
+        op.drop_index(op.f('ix_{}_genre_id'.format(link_table)), table_name=link_table)
+        op.drop_table(link_table)
+    op.drop_table('genre')
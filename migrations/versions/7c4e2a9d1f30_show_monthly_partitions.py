@@ -0,0 +1,94 @@
+"""show monthly partitions
+
+Revision ID: 7c4e2a9d1f30
+Revises: 36dfa0ed4407
+Create Date: 2026-10-18 12:40:02.518306
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from partitions import SHOW_INDEXES, add_months, create_default_partition, ensure_partitions, month_start
+
+
+# revision identifiers, used by Alembic.
+revision = '7c4e2a9d1f30'
+down_revision = '36dfa0ed4407'
+branch_labels = None
+depends_on = None
+
+
+# Months created ahead of now; afterwards the create-show-partitions job
+# keeps SHOW_PARTITIONS_AHEAD months ready.
+MONTHS_AHEAD = 12
+
+COLUMNS = 'id, start_time, venue_id, artist_id, updated_at'
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.execute(sa.text('SELECT count(*) FROM show WHERE start_time IS NULL')).scalar():
+        raise RuntimeError('Shows without a start_time cannot be partitioned; delete or fix them first.')
+
+    # start_time becomes part of the primary key on PostgreSQL.
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('show') as batch_op:
+            batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=False)
+        return
+
+    # Rebuild show as a partitioned table, reusing its id sequence.
+    for index, _ in SHOW_INDEXES:
+        op.drop_index(index, table_name='show')
+    op.execute('ALTER TABLE show RENAME TO show_unpartitioned')
+    op.execute('ALTER INDEX show_pkey RENAME TO show_unpartitioned_pkey')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY NONE')
+    op.execute(
+        "CREATE TABLE show ("
+        " id integer NOT NULL DEFAULT nextval('show_id_seq'),"
+        " start_time timestamp without time zone NOT NULL,"
+        " venue_id integer NOT NULL REFERENCES venue (id),"
+        " artist_id integer NOT NULL REFERENCES artist (id),"
+        " updated_at timestamp without time zone NOT NULL,"
+        " PRIMARY KEY (id, start_time)"
+        ") PARTITION BY RANGE (start_time)"
+    )
+    for index, columns in SHOW_INDEXES:
+        op.execute('CREATE INDEX {} ON show ({})'.format(index, columns))
+
+    create_default_partition(bind)
+    first = bind.execute(sa.text('SELECT min(start_time) FROM show_unpartitioned')).scalar()
+    current = month_start(datetime.datetime.now())
+    ensure_partitions(bind, min(first or current, current), add_months(current, MONTHS_AHEAD))
+
+    op.execute('INSERT INTO show ({0}) SELECT {0} FROM show_unpartitioned'.format(COLUMNS))
+    op.drop_table('show_unpartitioned')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY show.id')
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        with op.batch_alter_table('show') as batch_op:
+            batch_op.alter_column('start_time', existing_type=sa.DateTime(), nullable=True)
+        return
+
+    op.execute('ALTER TABLE show RENAME TO show_partitioned')
+    op.execute('ALTER INDEX show_pkey RENAME TO show_partitioned_pkey')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY NONE')
+    op.execute(
+        "CREATE TABLE show ("
+        " id integer NOT NULL DEFAULT nextval('show_id_seq') PRIMARY KEY,"
+        " start_time timestamp without time zone,"
+        " venue_id integer NOT NULL REFERENCES venue (id),"
+        " artist_id integer NOT NULL REFERENCES artist (id),"
+        " updated_at timestamp without time zone NOT NULL"
+        ")"
+    )
+    op.execute('INSERT INTO show ({0}) SELECT {0} FROM show_partitioned'.format(COLUMNS))
+    # Drops every partition and the partitioned indexes with it.
+    op.drop_table('show_partitioned')
+    op.execute('ALTER SEQUENCE show_id_seq OWNED BY show.id')
+    for index, columns in SHOW_INDEXES:
+        op.execute('CREATE INDEX {} ON show ({})'.format(index, columns))
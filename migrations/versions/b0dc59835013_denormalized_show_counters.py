@@ -0,0 +1,44 @@
+"""denormalized show counters
+
+Revision ID: b0dc59835013
+Revises: f285e07ff563
+Create Date: 2026-10-18 12:09:12.180821
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b0dc59835013'
+down_revision = 'f285e07ff563'
+branch_labels = None
+depends_on = None
+
+
+OWNERS = (('venue', 'venue_id'), ('artist', 'artist_id'))
+
+
+def upgrade():
+    # Backfilled from the shows as of the migration; from then on the Show
+    # CRUD methods and `flask refresh-show-counts` keep them current.
+    now = datetime.datetime.now()
+    show = sa.table('show', sa.column('id'), sa.column('venue_id'), sa.column('artist_id'), sa.column('start_time'))
+    for table, foreign_key in OWNERS:
+        op.add_column(table, sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+        op.add_column(table, sa.Column('past_shows_count', sa.Integer(), server_default='0', nullable=False))
+        owner = sa.table(table, sa.column('id'), sa.column('upcoming_shows_count'), sa.column('past_shows_count'))
+        count = sa.select([sa.func.count(show.c.id)]).where(show.c[foreign_key] == owner.c.id)
+        op.execute(owner.update().values(
+            upcoming_shows_count=count.where(show.c.start_time >= now).as_scalar(),
+            past_shows_count=count.where(show.c.start_time < now).as_scalar()
+        ))
+
+
+def downgrade():
+    for table, _ in OWNERS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('past_shows_count')
+            batch_op.drop_column('upcoming_shows_count')
@@ -0,0 +1,55 @@
+"""full text and trigram search
+
+Revision ID: eec96c3bc4ed
+Revises: a09eb5b55a04
+Create Date: 2026-10-18 11:48:47.312701
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eec96c3bc4ed'
+down_revision = 'a09eb5b55a04'
+branch_labels = None
+depends_on = None
+
+
+# Weighted document searched by search.PostgresSearchBackend: name ranks
+# above location, which ranks above genres.
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+    "setweight(to_tsvector('simple', replace(coalesce(genres, ''), ',', ' ')), 'C')"
+)
+
+TABLES = ('venue', 'artist')
+
+
+def upgrade():
+    # tsvector and pg_trgm are PostgreSQL only; other databases use the
+    # in-memory search index.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table in TABLES:
+        op.execute(
+            'ALTER TABLE {0} ADD COLUMN search_vector tsvector '
+            'GENERATED ALWAYS AS ({1}) STORED'.format(table, SEARCH_VECTOR)
+        )
+        op.execute('CREATE INDEX ix_{0}_search_vector ON {0} USING gin (search_vector)'.format(table))
+        op.execute('CREATE INDEX ix_{0}_name_trgm ON {0} USING gin (name gin_trgm_ops)'.format(table))
+        op.execute('CREATE INDEX ix_{0}_city_trgm ON {0} USING gin (city gin_trgm_ops)'.format(table))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    for table in TABLES:
+        op.execute('DROP INDEX IF EXISTS ix_{0}_city_trgm'.format(table))
+        op.execute('DROP INDEX IF EXISTS ix_{0}_name_trgm'.format(table))
+        op.execute('DROP INDEX IF EXISTS ix_{0}_search_vector'.format(table))
+        op.execute('ALTER TABLE {0} DROP COLUMN IF EXISTS search_vector'.format(table))
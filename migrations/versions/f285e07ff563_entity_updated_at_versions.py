@@ -0,0 +1,38 @@
+"""entity updated_at versions
+
+Revision ID: f285e07ff563
+Revises: bda390c9d058
+Create Date: 2026-10-18 11:53:40.417593
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f285e07ff563'
+down_revision = 'bda390c9d058'
+branch_labels = None
+depends_on = None
+
+
+TABLES = ('venue', 'artist', 'show')
+
+
+def upgrade():
+    # Existing rows are stamped with the migration time so the column can be
+    # made NOT NULL; new rows get their value from the model default.
+    now = datetime.datetime.utcnow()
+    for table in TABLES:
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.table(table, sa.column('updated_at')).update().values(updated_at=now))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -1,13 +1,87 @@
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, current_app
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import event, orm, text
 from flask_migrate import Migrate
 from flask_moment import Moment
 import datetime
+import itertools
+
+from cache import detail_cache, venue_key, artist_key
+from pool import engine_options, init_engine
+import routing
+
+
+class SQLAlchemy(BaseSQLAlchemy):
+    """Flask-SQLAlchemy with the connection pool configured from the DB_*
+    settings (see pool.py) and reads routed to replicas (see routing.py)."""
+
+    def init_app(self, app):
+        routing.init_app(app)
+        super(SQLAlchemy, self).init_app(app)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=routing.RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        super(SQLAlchemy, self).apply_driver_hacks(app, sa_url, options)
+        options.update(engine_options(app.config, sa_url))
+
+    def create_engine(self, sa_url, engine_opts):
+        engine = super(SQLAlchemy, self).create_engine(sa_url, engine_opts)
+        init_engine(current_app.config, engine)
+        return engine
+
 
 db = SQLAlchemy()
 
 
+venue_genre = db.Table(
+    'venue_genre',
+    db.Column('venue_id', db.Integer, db.ForeignKey('venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True, index=True)
+)
+
+artist_genre = db.Table(
+    'artist_genre',
+    db.Column('artist_id', db.Integer, db.ForeignKey('artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('genre.id'), primary_key=True, index=True)
+)
+
+
+def encode_show_cursor(show):
+    return '{}_{}'.format(show.start_time.isoformat(), show.id)
+
+
+def decode_show_cursor(cursor):
+    """Parse a cursor produced by encode_show_cursor, raising ValueError if malformed."""
+    start_time, _, show_id = cursor.rpartition('_')
+    return datetime.datetime.fromisoformat(start_time), int(show_id)
+
+
+class Genre(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    def __repr__(self):
+        return '<Genre {}>'.format(self.name)
+
+    @classmethod
+    def get_or_create_all(cls, names):
+        names = [name.strip() for name in names if name and name.strip()]
+        existing = {genre.name: genre for genre in cls.query.filter(cls.name.in_(names))} if names else {}
+        genres = []
+        for name in names:
+            if name not in existing:
+                existing[name] = cls(name=name)
+            genres.append(existing[name])
+        return genres
+
+
 class Venue(db.Model):
+    __table_args__ = (
+        db.Index('ix_venue_city_state', 'city', 'state'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
@@ -19,32 +93,32 @@ class Venue(db.Model):
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
     website = db.Column(db.String(120))
-    genres = db.Column(db.String)
-    venue = db.relationship('Show', backref=db.backref('venue', cascade='all, delete'), lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    # Denormalized show counts for the listings, maintained by the Show CRUD
+    # methods and re-bucketed by Show.refresh_counts as shows start.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    genre_objects = db.relationship('Genre', secondary=venue_genre, lazy='selectin', order_by='Genre.name')
+    # Deleting a venue deletes its shows (not the other way round).
+    venue = db.relationship('Show', backref='venue', cascade='all, delete-orphan', lazy=True)
 
     def __repr__(self):
         return '<Venue {}>'.format(self.name)
 
     @property
-    def venue_details(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'city': self.city,
-            'state': self.state,
-            'phone': self.phone,
-            'address': self.address,
-            'image_link': self.image_link,
-            'facebook_link': self.facebook_link,
-            'seeking_talent': self.seeking_talent,
-            'seeking_description': self.seeking_description,
-            'genres': self.genres.split(','),
-            'website': self.website
-        }
+    def genres(self):
+        return [genre.name for genre in self.genre_objects]
+
+    @genres.setter
+    def genres(self, names):
+        # Accepts the list posted by the genres SelectMultipleField as well as
+        # the legacy comma separated string.
+        if isinstance(names, str):
+            names = names.split(',')
+        self.genre_objects = Genre.get_or_create_all(names or [])
 
     @property
-    def get_venue_with_number_of_upcoming_show(self):
-        num_shows = Show.query.filter(Show.start_time > datetime.datetime.now(), Show.venue_id == self.id)
+    def venue_details(self):
         return {
             'id': self.id,
             'name': self.name,
@@ -54,30 +128,15 @@ class Venue(db.Model):
             'address': self.address,
             'image_link': self.image_link,
             'facebook_link': self.facebook_link,
-            'website': self.website,
             'seeking_talent': self.seeking_talent,
             'seeking_description': self.seeking_description,
-            'num_shows': num_shows
+            'genres': self.genres,
+            'website': self.website
         }
 
     @property
     def get_venue_with_show_details(self):
-        upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-            filter(
-                Show.start_time > datetime.datetime.now(),
-                Show.venue_id == self.id,
-                Show.artist_id == Artist.id
-            ).all()
-        upcoming_shows_with_artist_venue = [show.show_with_artist_venue for artist, show in upcoming_shows]
-
-        past_shows = db.session.query(Artist, Show).join(Show).join(Venue).\
-            filter(
-                Show.start_time < datetime.datetime.now(),
-                Show.venue_id == self.id,
-                Show.artist_id == Artist.id
-        ).all()
-        print(past_shows)
-        past_shows_with_artist_venue = [show.show_with_artist_venue for artist, show in past_shows]
+        shows = Show.split_upcoming_past(Show.venue_id == self.id, current_app.config.get('PAST_SHOWS_PER_PAGE', 10))
         return {
             'id': self.id,
             'name': self.name,
@@ -90,22 +149,23 @@ class Venue(db.Model):
             'seeking_talent': self.seeking_talent,
             'seeking_description': self.seeking_description,
             'website': self.website,
-            'upcoming_shows': upcoming_shows_with_artist_venue,
-            'past_shows': past_shows_with_artist_venue,
-            'upcoming_shows_count': len(upcoming_shows),
-            'past_shows_count': len(past_shows),
-            'genres': self.genres.split(','),
+            'upcoming_shows': shows['upcoming_shows'],
+            'past_shows': shows['past_shows'],
+            'past_shows_cursor': shows['past_shows_cursor'],
+            'upcoming_shows_count': shows['upcoming_shows_count'],
+            'past_shows_count': shows['past_shows_count'],
+            'genres': self.genres,
         }
 
     @property
-    def group_venue_by_city_state(self):
-        venues = Venue.query.filter(Venue.city == self.city, Venue.state == self.state).all()
-        grouped_venues = [venue.get_venue_with_number_of_upcoming_show for venue in venues]
-        return {
-            'city': self.city,
-            'state': self.state,
-            'venues': grouped_venues
-        }
+    def artist_ids(self):
+        return [artist_id for artist_id, in db.session.query(Show.artist_id).filter(Show.venue_id == self.id).distinct()]
+
+    @property
+    def cache_keys(self):
+        # The venue page and the page of every artist with a show here,
+        # which embeds this venue's details.
+        return [venue_key(self.id)] + [artist_key(artist_id) for artist_id in self.artist_ids]
 
 # ---------------- CRUD methods --------------#
     def add(self):
@@ -113,14 +173,28 @@ class Venue(db.Model):
         db.session.commit()
 
     def update(self):
+        cache_keys = self.cache_keys
+        # Bumped explicitly: a genres-only edit does not update this row.
+        self.updated_at = datetime.datetime.utcnow()
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
     def delete(self):
+        artist_ids = self.artist_ids
+        cache_keys = [venue_key(self.id)] + [artist_key(artist_id) for artist_id in artist_ids]
         db.session.delete(self)
+        db.session.flush()
+        # The artists lose the shows deleted with it.
+        Show.refresh_counts(venue_ids=(), artist_ids=artist_ids)
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
 
 class Artist(db.Model):
+    __table_args__ = (
+        db.Index('ix_artist_city_state', 'city', 'state'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
@@ -131,12 +205,30 @@ class Artist(db.Model):
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    genres = db.Column(db.String(120))
-    artist = db.relationship('Show', backref=db.backref('artist', cascade='all, delete'), lazy=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    # Denormalized show counts for the listings, maintained by the Show CRUD
+    # methods and re-bucketed by Show.refresh_counts as shows start.
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    past_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    genre_objects = db.relationship('Genre', secondary=artist_genre, lazy='selectin', order_by='Genre.name')
+    # Deleting a artist deletes its shows (not the other way round).
+    artist = db.relationship('Show', backref='artist', cascade='all, delete-orphan', lazy=True)
 
     def __repr__(self):
         return '<Artist {}>'.format(self.name)
 
+    @property
+    def genres(self):
+        return [genre.name for genre in self.genre_objects]
+
+    @genres.setter
+    def genres(self, names):
+        # Accepts the list posted by the genres SelectMultipleField as well as
+        # the legacy comma separated string.
+        if isinstance(names, str):
+            names = names.split(',')
+        self.genre_objects = Genre.get_or_create_all(names or [])
+
     @property
     def artist_details(self):
         return {
@@ -149,98 +241,361 @@ class Artist(db.Model):
             'facebook_link': self.facebook_link,
             'seeking_venue': self.seeking_venue,
             'seeking_description': self.seeking_description,
-            'genres': self.genres.split(','),
+            'genres': self.genres,
             'website': self.website
         }
 
     @property
     def get_artist_with_show_details(self):
-        upcoming_shows = db.session.query(Artist, Show).join(Show).join(Venue). \
-            filter(
-            Show.start_time > datetime.datetime.now(),
-            Show.venue_id == Venue.id,
-            Show.artist_id == self.id
-        ).all()
-        upcoming_shows_with_artist_venue = [show.show_with_artist_venue for artist, show in upcoming_shows]
-
-        past_shows = db.session.query(Artist, Show).join(Show).join(Venue). \
-            filter(
-            Show.start_time < datetime.datetime.now(),
-            Show.venue_id == Venue.id,
-            Show.artist_id == self.id
-        ).all()
-        past_shows_with_artist_venue = [show.show_with_artist_venue for artist, show in past_shows]
+        shows = Show.split_upcoming_past(Show.artist_id == self.id, current_app.config.get('PAST_SHOWS_PER_PAGE', 10))
         return {
             'id': self.id,
             'name': self.name,
             'city': self.city,
             'state': self.state,
             'phone': self.phone,
-            'genres': self.genres.split(','),
+            'genres': self.genres,
             'image_link': self.image_link,
             'facebook_link': self.facebook_link,
             'seeking_venue': self.seeking_venue,
             'seeking_description': self.seeking_description,
             'website': self.website,
-            'upcoming_shows': upcoming_shows_with_artist_venue,
-            'past_shows': past_shows_with_artist_venue,
-            'upcoming_shows_count': len(upcoming_shows),
-            'past_shows_count': len(past_shows)
+            'upcoming_shows': shows['upcoming_shows'],
+            'past_shows': shows['past_shows'],
+            'past_shows_cursor': shows['past_shows_cursor'],
+            'upcoming_shows_count': shows['upcoming_shows_count'],
+            'past_shows_count': shows['past_shows_count']
         }
 
+    @property
+    def venue_ids(self):
+        return [venue_id for venue_id, in db.session.query(Show.venue_id).filter(Show.artist_id == self.id).distinct()]
+
+    @property
+    def cache_keys(self):
+        # The artist page and the page of every venue this artist plays at,
+        # which embeds this artist's details.
+        return [artist_key(self.id)] + [venue_key(venue_id) for venue_id in self.venue_ids]
+
 # ---------------- CRUD methods --------------#
     def add(self):
         db.session.add(self)
         db.session.commit()
 
     def update(self):
+        cache_keys = self.cache_keys
+        # Bumped explicitly: a genres-only edit does not update this row.
+        self.updated_at = datetime.datetime.utcnow()
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
     def delete(self):
+        venue_ids = self.venue_ids
+        cache_keys = [artist_key(self.id)] + [venue_key(venue_id) for venue_id in venue_ids]
         db.session.delete(self)
+        db.session.flush()
+        # The venues lose the shows deleted with it.
+        Show.refresh_counts(artist_ids=(), venue_ids=venue_ids)
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
 
 class Show(db.Model):
+    # Detail pages read a venue's or an artist's shows ordered by start_time,
+    # and /shows pages through (start_time, id).
+    __table_args__ = (
+        db.Index('ix_show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_show_start_time_id', 'start_time', 'id'),
+    )
+
+    # On PostgreSQL the table is range partitioned by month of start_time and
+    # its primary key is (id, start_time); see partitions.py.
     id = db.Column(db.Integer, primary_key=True)
-    start_time = db.Column(db.DateTime())
-    venue_id = db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False)
+    start_time = db.Column(db.DateTime(), nullable=False)
+    # active_history: related_ids needs the previous venue/artist even when
+    # a commit expired it before the show was moved.
+    venue_id = orm.column_property(db.Column(db.Integer, db.ForeignKey('venue.id'), nullable=False), active_history=True)
+    artist_id = orm.column_property(db.Column(db.Integer, db.ForeignKey('artist.id'), nullable=False), active_history=True)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     def __repr__(self):
         return '<Show {}{}>'.format(self.artist_id, self.venue_id)
 
+    @property
+    def related_ids(self):
+        # Both sides of the show, including the previous venue/artist when
+        # an update moved it.
+        state = db.inspect(self)
+        venue_ids = set(state.attrs.venue_id.history.sum()) or {self.venue_id}
+        artist_ids = set(state.attrs.artist_id.history.sum()) or {self.artist_id}
+        return venue_ids, artist_ids
+
+    @property
+    def cache_keys(self):
+        venue_ids, artist_ids = self.related_ids
+        return [venue_key(venue_id) for venue_id in venue_ids] + \
+            [artist_key(artist_id) for artist_id in artist_ids]
+
+    def count_in(self, delta):
+        # Atomic "count = count + delta", so concurrent adds cannot lose one.
+        # The counters keep updated_at, which versions the entity's own
+        # details (see http_cache); the table version still changes.
+        if self.start_time is None:
+            return
+        bucket = 'upcoming_shows_count' if self.start_time >= datetime.datetime.now() else 'past_shows_count'
+        for model, entity_id in ((Venue, self.venue_id), (Artist, self.artist_id)):
+            column = getattr(model, bucket)
+            model.query.filter(model.id == entity_id).\
+                update({column: column + delta, model.updated_at: model.updated_at}, synchronize_session=False)
+
+    @classmethod
+    def refresh_counts(cls, now=None, since=None, venue_ids=None, artist_ids=None):
+        """Recompute the upcoming/past counters of venues and artists from
+        their shows, writing only the rows whose counts changed. Returns the
+        number of rows written; the caller commits.
+
+        since limits the work to the entities with a show starting in
+        [since, now), i.e. the shows a periodic re-bucketing has to move;
+        venue_ids/artist_ids limit it to the given entities.
+        """
+        now = now or datetime.datetime.now()
+        changed = 0
+        for model, foreign_key, ids in ((Venue, cls.venue_id, venue_ids), (Artist, cls.artist_id, artist_ids)):
+            upcoming = db.select([db.func.count(cls.id)]).\
+                where(foreign_key == model.id).where(cls.start_time >= now).as_scalar()
+            past = db.select([db.func.count(cls.id)]).\
+                where(foreign_key == model.id).where(cls.start_time < now).as_scalar()
+            query = model.query.filter(db.or_(model.upcoming_shows_count != upcoming,
+                                              model.past_shows_count != past))
+            if since is not None:
+                moved = db.session.query(foreign_key).filter(cls.start_time >= since, cls.start_time < now)
+                query = query.filter(model.id.in_(moved.subquery()))
+            if ids is not None:
+                query = query.filter(model.id.in_(list(ids)))
+            changed += query.update({
+                model.upcoming_shows_count: upcoming,
+                model.past_shows_count: past,
+                model.updated_at: model.updated_at
+            }, synchronize_session=False)
+        return changed
+
 # ---------------- CRUD methods --------------#
     def add(self):
+        cache_keys = self.cache_keys
         db.session.add(self)
+        self.count_in(1)
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
     def update(self):
+        # A moved or rescheduled show is recounted on both of its old and
+        # new sides.
+        cache_keys = self.cache_keys
+        venue_ids, artist_ids = self.related_ids
+        db.session.flush()
+        Show.refresh_counts(venue_ids=venue_ids, artist_ids=artist_ids)
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
     def delete(self):
+        # Recounted rather than decremented: the show may have started since
+        # the counters were last re-bucketed.
+        cache_keys = self.cache_keys
+        venue_ids, artist_ids = self.related_ids
         db.session.delete(self)
+        db.session.flush()
+        Show.refresh_counts(venue_ids=venue_ids, artist_ids=artist_ids)
         db.session.commit()
+        detail_cache.invalidate(*cache_keys)
 
     @property
     def show_details(self):
         return {
             'id': self.id,
-            'start_time': self.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
+            'start_time': self.start_time,
             'venue_id': self.venue_id,
             'artist_id': self.artist_id
         }
 
+    @classmethod
+    def query_with_artist_venue(cls):
+        # venue and artist are joined and populated by the same statement,
+        # so serializing the shows never goes back to the database.
+        return cls.query.join(cls.venue).join(cls.artist).options(
+            db.contains_eager(cls.venue),
+            db.contains_eager(cls.artist)
+        )
+
+    @classmethod
+    def split_upcoming_past(cls, criterion, past_limit):
+        # Every upcoming show of a venue/artist, in start order, its past_limit
+        # most recent past shows, newest first (older ones are paged with
+        # past_page), and the number of past shows. One statement (the eager
+        # loaders run once) against one snapshot of "now"; shows starting
+        # exactly now count as upcoming.
+        now = datetime.datetime.now()
+        recent_past = db.session.query(cls.id).filter(criterion, cls.start_time < now).\
+            order_by(cls.start_time.desc(), cls.id.desc()).limit(past_limit + 1)
+        past_count = db.select([db.func.count(cls.id)]).\
+            where(criterion).where(cls.start_time < now).correlate(None).as_scalar()
+        rows = cls.query_with_artist_venue().add_columns(past_count).filter(criterion).\
+            filter(db.or_(cls.start_time >= now, cls.id.in_(recent_past.subquery()))).\
+            order_by(cls.start_time, cls.id).all()
+
+        shows = [show for show, _ in rows]
+        upcoming_shows = [show for show in shows if show.start_time >= now]
+        past_shows = [show for show in reversed(shows) if show.start_time < now]
+        past_shows_cursor = encode_show_cursor(past_shows[past_limit - 1]) if len(past_shows) > past_limit else None
+        return {
+            'upcoming_shows': [show.show_with_artist_venue for show in upcoming_shows],
+            'past_shows': [show.show_with_artist_venue for show in past_shows[:past_limit]],
+            'past_shows_cursor': past_shows_cursor,
+            'upcoming_shows_count': len(upcoming_shows),
+            'past_shows_count': rows[0][1] if rows else 0
+        }
+
+    @classmethod
+    def past_page(cls, criterion, before=None, per_page=10, now=None):
+        """Return one page of serialized past shows matching criterion,
+        newest first, and the cursor of the next (older) page.
+
+        before is a cursor from encode_show_cursor; ValueError if malformed.
+        """
+        now = now or datetime.datetime.now()
+        query = cls.query_with_artist_venue().filter(criterion, cls.start_time < now)
+        if before is not None:
+            start_time, show_id = decode_show_cursor(before)
+            query = query.filter(db.or_(
+                cls.start_time < start_time,
+                db.and_(cls.start_time == start_time, cls.id < show_id)
+            ))
+        shows = query.order_by(cls.start_time.desc(), cls.id.desc()).limit(per_page + 1).all()
+
+        next_cursor = encode_show_cursor(shows[per_page - 1]) if len(shows) > per_page else None
+        return [show.show_with_artist_venue for show in shows[:per_page]], next_cursor
+
     @property
     def show_with_artist_venue(self):
-        venues = Venue.query.filter(Venue.id == self.venue_id).one()
-        venue = venues.venue_details
-
-        artists = Artist.query.filter(Artist.id == self.artist_id).one()
-        artist = artists.artist_details
         return {
             'id': self.id,
-            'start_time': self.start_time.strftime("%m/%d/%Y, %H:%M:%S"),
-            'venue': venue,
-            'artist': artist,
-        }
\ No newline at end of file
+            'start_time': self.start_time,
+            'venue': self.venue.venue_details,
+            'artist': self.artist.artist_details,
+        }
+
+
+class ShowArchive(db.Model):
+    # Shows moved out of show by the archive-old-shows job (jobs.py). The ids
+    # are plain integers so archived history outlives deleted venues/artists.
+    __tablename__ = 'show_archive'
+
+    # Serializes archive runs between workers, as partitions.ADVISORY_LOCK_ID
+    # does partition maintenance.
+    ADVISORY_LOCK_ID = 2401190002
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    start_time = db.Column(db.DateTime(), index=True)
+    venue_id = db.Column(db.Integer, nullable=False, index=True)
+    artist_id = db.Column(db.Integer, nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return '<ShowArchive {}>'.format(self.id)
+
+    @classmethod
+    def archive_before(cls, cutoff, batch_size):
+        """Move the shows starting before cutoff into the archive, batch_size
+        per transaction, recounting the venues/artists they leave. Returns the
+        number of shows moved. On PostgreSQL each batch holds an advisory
+        lock, so workers running the job at once take turns instead of
+        archiving the same shows twice."""
+        postgresql = db.session.get_bind(Show.__mapper__).dialect.name == 'postgresql'
+        moved = 0
+        while True:
+            if postgresql:
+                db.session.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': cls.ADVISORY_LOCK_ID})
+            rows = db.session.query(Show.id, Show.start_time, Show.venue_id, Show.artist_id, Show.updated_at).\
+                filter(Show.start_time < cutoff).order_by(Show.start_time, Show.id).limit(batch_size).all()
+            if not rows:
+                db.session.commit()  # releases the lock
+                return moved
+            archived_at = datetime.datetime.utcnow()
+            db.session.execute(cls.__table__.insert(), [dict(row._asdict(), archived_at=archived_at) for row in rows])
+            Show.query.filter(Show.id.in_([row.id for row in rows])).delete(synchronize_session=False)
+            venue_ids = {row.venue_id for row in rows}
+            artist_ids = {row.artist_id for row in rows}
+            Show.refresh_counts(venue_ids=venue_ids, artist_ids=artist_ids)
+            db.session.commit()
+            detail_cache.invalidate(*[venue_key(venue_id) for venue_id in venue_ids] +
+                                     [artist_key(artist_id) for artist_id in artist_ids])
+            moved += len(rows)
+
+
+class TableVersion(db.Model):
+    # One counter per table behind the listing pages, bumped in the
+    # transaction of every write to the table (see the session events below),
+    # so http_cache reads the version of a whole table by primary key. The
+    # bump holds the row until commit, which serializes a table's writers.
+    __tablename__ = 'table_version'
+
+    TABLES = ('venue', 'artist', 'show')
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return '<TableVersion {} {}>'.format(self.name, self.version)
+
+    @classmethod
+    def versions(cls, *names):
+        """(version, updated_at) of each of the named tables, flattened in order."""
+        rows = {row.name: (row.version, row.updated_at) for row in
+                db.session.query(cls.name, cls.version, cls.updated_at).filter(cls.name.in_(names))}
+        return tuple(itertools.chain.from_iterable(rows.get(name, (None, None)) for name in names))
+
+    @classmethod
+    def bump(cls, session, names):
+        """Bump the versions of the named tables, once per transaction."""
+        bumped = session.info.setdefault('bumped_tables', set())
+        names = sorted(set(names) - bumped)
+        if not names:
+            return
+        session.execute(cls.__table__.update().where(cls.name.in_(names)).values(
+            version=cls.version + 1, updated_at=datetime.datetime.utcnow()))
+        bumped.update(names)
+
+
+@event.listens_for(TableVersion.__table__, 'after_create')
+def create_table_versions(table, connection, **kwargs):
+    now = datetime.datetime.utcnow()
+    connection.execute(table.insert(), [
+        {'name': name, 'version': 0, 'updated_at': now} for name in TableVersion.TABLES
+    ])
+
+
+VERSIONED_MODELS = (Venue, Artist, Show)
+
+
+@event.listens_for(routing.RoutingSession, 'after_flush')
+def bump_flushed_tables(session, flush_context):
+    TableVersion.bump(session, [
+        instance.__table__.name for instance in itertools.chain(session.new, session.dirty, session.deleted)
+        if isinstance(instance, VERSIONED_MODELS)
+    ])
+
+
+@event.listens_for(routing.RoutingSession, 'after_bulk_update')
+@event.listens_for(routing.RoutingSession, 'after_bulk_delete')
+def bump_bulk_tables(context):
+    # Query.update()/delete(): the show counters, archiving.
+    if issubclass(context.mapper.class_, VERSIONED_MODELS) and context.result.rowcount:
+        TableVersion.bump(context.session, [context.mapper.local_table.name])
+
+
+@event.listens_for(routing.RoutingSession, 'after_transaction_end')
+def forget_bumped_tables(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('bumped_tables', None)
@@ -0,0 +1,101 @@
+import datetime
+
+from sqlalchemy import text
+
+
+# On PostgreSQL show is range partitioned by month of start_time (see the
+# show_monthly_partitions migration): show_y2024m01 holds January 2024 and
+# show_default everything without a partition yet. Each partition carries the
+# indexes of the model, named after them, so `flask check-indexes` still
+# finds them in the plans.
+SHOW_INDEXES = (
+    ('ix_show_venue_id_start_time', 'venue_id, start_time'),
+    ('ix_show_artist_id_start_time', 'artist_id, start_time'),
+    ('ix_show_start_time_id', 'start_time, id'),
+)
+
+DEFAULT_PARTITION = 'show_default'
+
+# Serializes partition maintenance between processes.
+ADVISORY_LOCK_ID = 2401190001
+
+
+#----------------------------------------------------------------------------#
+# Months.
+#----------------------------------------------------------------------------#
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return 'show_y{:%Y}m{:%m}'.format(month, month)
+
+
+#----------------------------------------------------------------------------#
+# Partitions.
+#----------------------------------------------------------------------------#
+
+def is_partitioned(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(text(
+        "SELECT 1 FROM pg_partitioned_table JOIN pg_class ON pg_class.oid = partrelid "
+        "WHERE relname = 'show' AND pg_table_is_visible(pg_class.oid)"
+    )).scalar() is not None
+
+
+def existing_partitions(connection):
+    return {name for name, in connection.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = inhrelid "
+        "JOIN pg_class parent ON parent.oid = inhparent "
+        "WHERE parent.relname = 'show' AND pg_table_is_visible(parent.oid)"
+    ))}
+
+
+def attach_partition(connection, name, bounds):
+    # Built separately and attached, rather than CREATE TABLE ... PARTITION
+    # OF, so its indexes get our names and rows that went to the default
+    # partition before it existed can be moved in first.
+    connection.execute(text('CREATE TABLE {} (LIKE show INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'.format(name)))
+    for index, columns in SHOW_INDEXES:
+        connection.execute(text('CREATE INDEX {}_{} ON {} ({})'.format(index, name[len('show_'):], name, columns)))
+    if bounds != 'DEFAULT':
+        lower, upper = bounds
+        criterion = 'start_time >= :lower AND start_time < :upper'
+        if DEFAULT_PARTITION in existing_partitions(connection):
+            connection.execute(text('INSERT INTO {} SELECT * FROM {} WHERE {}'.format(name, DEFAULT_PARTITION, criterion)),
+                               lower=lower, upper=upper)
+            connection.execute(text('DELETE FROM {} WHERE {}'.format(DEFAULT_PARTITION, criterion)),
+                               lower=lower, upper=upper)
+        bounds = "FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(lower, upper)
+    connection.execute(text('ALTER TABLE show ATTACH PARTITION {} {}'.format(name, bounds)))
+
+
+def create_default_partition(connection):
+    attach_partition(connection, DEFAULT_PARTITION, 'DEFAULT')
+
+
+def ensure_partitions(connection, first_month, last_month):
+    """Create the missing monthly partitions of show from first_month
+    through last_month and return their names. Does nothing when show is
+    not partitioned, e.g. on SQLite."""
+    if not is_partitioned(connection):
+        return []
+    connection.execute(text('SELECT pg_advisory_xact_lock(:id)'), id=ADVISORY_LOCK_ID)
+    existing = existing_partitions(connection)
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        name = partition_name(month)
+        if name not in existing:
+            attach_partition(connection, name, (month, add_months(month, 1)))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
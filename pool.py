@@ -0,0 +1,176 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.pool import QueuePool, NullPool
+
+
+#----------------------------------------------------------------------------#
+# Metrics.
+#----------------------------------------------------------------------------#
+
+class PoolMetrics(object):
+    """Process wide counters of connection checkouts, of the time spent
+    waiting for a free connection and, apart from it, of the time spent
+    opening new ones (QueuePool overflow, every NullPool checkout)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.timeouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.connects = 0
+            self.connect_seconds_total = 0.0
+
+    def record_checkout(self, wait):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait
+            self.wait_seconds_max = max(self.wait_seconds_max, wait)
+
+    def record_connect(self, seconds):
+        with self.lock:
+            self.connects += 1
+            self.connect_seconds_total += seconds
+
+    def record_timeout(self):
+        with self.lock:
+            self.timeouts += 1
+
+    def record_checkin(self):
+        with self.lock:
+            self.checkins += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'checked_out': self.checkouts - self.checkins,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': self.wait_seconds_total,
+                'wait_seconds_max': self.wait_seconds_max,
+                'connects': self.connects,
+                'connect_seconds_total': self.connect_seconds_total,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedPoolMixin(object):
+    # Time this thread's current checkout spent connecting, which is not
+    # waiting for the pool.
+    connecting = threading.local()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        self.connecting.seconds = 0.0
+        try:
+            connection = super(TimedPoolMixin, self)._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        pool_metrics.record_checkout(time.perf_counter() - started - self.connecting.seconds)
+        return connection
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        connection = super(TimedPoolMixin, self)._create_connection()
+        seconds = time.perf_counter() - started
+        self.connecting.seconds += seconds
+        pool_metrics.record_connect(seconds)
+        return connection
+
+    def _do_return_conn(self, conn):
+        pool_metrics.record_checkin()
+        return super(TimedPoolMixin, self)._do_return_conn(conn)
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def render_metrics(engine=None):
+    """Pool metrics in the Prometheus text exposition format."""
+    metrics = pool_metrics.snapshot()
+    lines = [
+        '# TYPE fyyur_db_pool_checkouts_total counter',
+        'fyyur_db_pool_checkouts_total {}'.format(metrics['checkouts']),
+        '# TYPE fyyur_db_pool_checked_out gauge',
+        'fyyur_db_pool_checked_out {}'.format(metrics['checked_out']),
+        '# TYPE fyyur_db_pool_timeouts_total counter',
+        'fyyur_db_pool_timeouts_total {}'.format(metrics['timeouts']),
+        '# TYPE fyyur_db_pool_wait_seconds_total counter',
+        'fyyur_db_pool_wait_seconds_total {:.6f}'.format(metrics['wait_seconds_total']),
+        '# TYPE fyyur_db_pool_wait_seconds_max gauge',
+        'fyyur_db_pool_wait_seconds_max {:.6f}'.format(metrics['wait_seconds_max']),
+        '# TYPE fyyur_db_pool_connects_total counter',
+        'fyyur_db_pool_connects_total {}'.format(metrics['connects']),
+        '# TYPE fyyur_db_pool_connect_seconds_total counter',
+        'fyyur_db_pool_connect_seconds_total {:.6f}'.format(metrics['connect_seconds_total']),
+    ]
+    pool = getattr(engine, 'pool', None)
+    if isinstance(pool, QueuePool):
+        lines += [
+            '# TYPE fyyur_db_pool_size gauge',
+            'fyyur_db_pool_size {}'.format(pool.size()),
+            '# TYPE fyyur_db_pool_overflow gauge',
+            'fyyur_db_pool_overflow {}'.format(pool.overflow()),
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+#----------------------------------------------------------------------------#
+# Engine options.
+#----------------------------------------------------------------------------#
+
+def engine_options(config, url):
+    """create_engine options for url built from the DB_* settings in config.py.
+
+    SQLite keeps the pool Flask-SQLAlchemy picks for it. In PgBouncer mode
+    connections are not pooled by the app (NullPool) and the statement
+    timeout is set per transaction, since PgBouncer's transaction pooling
+    neither keeps session settings nor forwards startup options.
+    """
+    options = {}
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite':
+        return options
+
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+    if config.get('DB_PGBOUNCER_MODE'):
+        options['poolclass'] = TimedNullPool
+        return options
+
+    options.update(
+        poolclass=TimedQueuePool,
+        pool_size=config.get('DB_POOL_SIZE', 5),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 10),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+        pool_recycle=config.get('DB_POOL_RECYCLE', -1),
+        pool_pre_ping=config.get('DB_POOL_PRE_PING', False),
+    )
+    if statement_timeout and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': '-c statement_timeout={:d}'.format(statement_timeout)}
+    return options
+
+
+def init_engine(config, engine):
+    """Engine level setup that cannot be expressed as create_engine options."""
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+    if config.get('DB_PGBOUNCER_MODE') and statement_timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.execute('SET LOCAL statement_timeout = {:d}'.format(statement_timeout))
@@ -0,0 +1,150 @@
+import cProfile
+import datetime
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from flask import Blueprint, current_app, g, request, render_template, send_from_directory, abort
+
+from tokens import TokenGate
+
+
+#----------------------------------------------------------------------------#
+# Activation.
+#----------------------------------------------------------------------------#
+
+profile_tokens = TokenGate('PROFILING', 'profile', 'X-Fyyur-Profile', query_arg='profile_token')
+
+
+def make_token(app):
+    """Header value that switches profiling on for one request."""
+    return profile_tokens.make_token(app)
+
+
+def has_token(app):
+    """True if the request carries a valid, unexpired token in
+    PROFILING_HEADER (or, for browsers, in the profile_token query argument)."""
+    return profile_tokens.has_token(app)
+
+
+def profiling_requested(app):
+    """True if profiling is switched on in config.py or the request carries
+    a valid token (see has_token)."""
+    return bool(app.config.get('PROFILING_ENABLED')) or has_token(app)
+
+
+#----------------------------------------------------------------------------#
+# Profiler.
+#----------------------------------------------------------------------------#
+
+class RequestProfiler(object):
+    """Run opted-in requests under cProfile.
+
+    Each profiled request leaves <endpoint>-<timestamp>.prof (pstats format,
+    for snakeviz or a flamegraph converter) and <endpoint>-<timestamp>.sql.json
+    (statements, parameters and durations) in PROFILING_DIR, and is listed on
+    /admin/profiles, slowest first. Only the last PROFILING_HISTORY requests
+    are kept, on the page and on disk.
+    """
+
+    def __init__(self, app=None):
+        self.recent = deque(maxlen=200)
+        self.lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.recent = deque(maxlen=app.config.get('PROFILING_HISTORY', 200))
+        app.register_blueprint(admin)
+
+        @app.before_request
+        def start():
+            if request.blueprint != admin.name and profiling_requested(app):
+                self.start()
+
+        @app.after_request
+        def finish(response):
+            if g.get('profile') is not None:
+                self.finish(app, response)
+            return response
+
+    def start(self):
+        g.sql_trace = []
+        g.profile_started = time.perf_counter()
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+    def finish(self, app, response):
+        profile = g.pop('profile')
+        profile.disable()
+        wall = time.perf_counter() - g.pop('profile_started')
+        trace = g.pop('sql_trace', [])
+
+        endpoint = request.endpoint or 'unmatched'
+        finished_at = datetime.datetime.now()
+        name = '{}-{}'.format(endpoint, finished_at.strftime('%Y%m%dT%H%M%S%f'))
+        directory = app.config['PROFILING_DIR']
+        os.makedirs(directory, exist_ok=True)
+        profile.dump_stats(os.path.join(directory, name + '.prof'))
+        with open(os.path.join(directory, name + '.sql.json'), 'w', encoding='utf-8') as stream:
+            json.dump(trace, stream, indent=2, default=str)
+
+        with self.lock:
+            if len(self.recent) == self.recent.maxlen:
+                # The oldest entry falls out of the list; so do its files.
+                self.remove_files(directory, self.recent[0]['name'])
+            self.recent.append({
+                'name': name,
+                'time': finished_at,
+                'method': request.method,
+                'path': request.full_path.rstrip('?'),
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'wall_ms': wall * 1000,
+                'queries': len(trace),
+                'db_ms': sum(query['seconds'] for query in trace) * 1000,
+            })
+
+    @staticmethod
+    def remove_files(directory, name):
+        for suffix in ('.prof', '.sql.json'):
+            try:
+                os.remove(os.path.join(directory, name + suffix))
+            except FileNotFoundError:
+                pass
+
+    def slowest(self, limit=50):
+        with self.lock:
+            return sorted(self.recent, key=lambda entry: entry['wall_ms'], reverse=True)[:limit]
+
+
+request_profiler = RequestProfiler()
+
+
+#----------------------------------------------------------------------------#
+# Admin page.
+#----------------------------------------------------------------------------#
+
+admin = Blueprint('profiles', __name__, url_prefix='/admin/profiles')
+
+
+@admin.before_request
+def require_profiling():
+    # The page and the files need a token even with PROFILING_ENABLED, which
+    # would otherwise open them to everyone.
+    if not has_token(current_app):
+        abort(404)
+
+
+@admin.route('/')
+def slowest_requests():
+    return render_template('pages/profiles.html', entries=request_profiler.slowest())
+
+
+@admin.route('/<path:filename>')
+def download(filename):
+    if not filename.endswith(('.prof', '.sql.json')):
+        abort(404)
+    return send_from_directory(current_app.config['PROFILING_DIR'], filename, as_attachment=True)
@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+from models import db, Venue, Artist, Show, Genre, encode_show_cursor, decode_show_cursor
+
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def venues_grouped_by_area(genre=None):
+    """Build the city/state -> venues -> upcoming show count listing,
+    optionally limited to venues of one genre.
+
+    The whole structure comes from a single query instead of one query per
+    area plus one query per venue. The counts are the precomputed counters,
+    as of the last Show.refresh_counts.
+    """
+    query = db.session.query(
+        Venue.id,
+        Venue.name,
+        Venue.city,
+        Venue.state,
+        Venue.updated_at,
+        Venue.upcoming_shows_count.label('num_shows')
+    )
+    if genre:
+        query = query.join(Venue.genre_objects).filter(Genre.name == genre)
+    rows = query.order_by(Venue.state, Venue.city, Venue.id).all()
+
+    areas = OrderedDict()
+    for venue_id, name, city, state, updated_at, num_shows in rows:
+        area = areas.get((city, state))
+        if area is None:
+            area = areas[(city, state)] = {
+                'city': city,
+                'state': state,
+                'venues': [],
+                'version': []
+            }
+        area['venues'].append({
+            'id': venue_id,
+            'name': name,
+            'num_shows': num_shows
+        })
+        # Fragment cache key of the area block (templates/pages/venues.html).
+        area['version'].append((venue_id, updated_at, num_shows))
+    return list(areas.values())
+
+
+#----------------------------------------------------------------------------#
+# Artists.
+#----------------------------------------------------------------------------#
+
+def artists_page(after_id=None, per_page=50, genre=None):
+    """Return one page of artists ordered by id and the cursor of the next page,
+    optionally limited to artists of one genre.
+
+    The page is selected with ``id > after_id`` rather than an OFFSET, so
+    every page costs the same index range scan.
+    """
+    query = db.session.query(Artist.id, Artist.name).order_by(Artist.id)
+    if genre:
+        query = query.join(Artist.genre_objects).filter(Genre.name == genre)
+    if after_id is not None:
+        query = query.filter(Artist.id > after_id)
+    rows = query.limit(per_page + 1).all()
+
+    next_cursor = rows[per_page - 1].id if len(rows) > per_page else None
+    artists = [{'id': artist_id, 'name': name} for artist_id, name in rows[:per_page]]
+    return artists, next_cursor
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def shows_page(cursor=None, per_page=30):
+    """Return one page of serialized shows ordered by (start_time, id) and the next cursor."""
+    query = Show.query_with_artist_venue().order_by(Show.start_time, Show.id)
+    if cursor is not None:
+        start_time, show_id = decode_show_cursor(cursor)
+        query = query.filter(db.or_(
+            Show.start_time > start_time,
+            db.and_(Show.start_time == start_time, Show.id > show_id)
+        ))
+    shows = query.limit(per_page + 1).all()
+
+    next_cursor = encode_show_cursor(shows[per_page - 1]) if len(shows) > per_page else None
+    data = []
+    for show in shows[:per_page]:
+        serialized = show.show_with_artist_venue
+        # Fragment cache key of the show tile (templates/pages/shows.html).
+        serialized['version'] = (show.updated_at, show.venue.updated_at, show.artist.updated_at)
+        data.append(serialized)
+    return data, next_cursor
+
+
+#----------------------------------------------------------------------------#
+# Batches.
+#----------------------------------------------------------------------------#
+
+def iterate_in_batches(query, key, batch_size=500):
+    """Yield every row of query ordered by key, loading batch_size rows at a time.
+
+    Each batch is a separate keyset query (key > last key seen), so memory
+    stays bounded by one batch whatever the database driver buffers, and
+    eager loaders run once per batch.
+    """
+    last = None
+    while True:
+        batch_query = query if last is None else query.filter(key > last)
+        batch = batch_query.order_by(key).limit(batch_size).all()
+        for row in batch:
+            yield row
+        if len(batch) < batch_size:
+            return
+        last = getattr(batch[-1], key.key)
@@ -0,0 +1,60 @@
+import datetime
+
+from models import db, Venue, Artist, Show
+
+
+#----------------------------------------------------------------------------#
+# Index checks.
+#----------------------------------------------------------------------------#
+
+def indexed_queries():
+    """The hot queries of the app, each with the index its plan must use."""
+    now = datetime.datetime.now()
+    return [
+        ('venue shows by start_time', 'ix_show_venue_id_start_time',
+         Show.query.filter(Show.venue_id == 1).order_by(Show.start_time)),
+        ('artist shows by start_time', 'ix_show_artist_id_start_time',
+         Show.query.filter(Show.artist_id == 1).order_by(Show.start_time)),
+        ('recent past shows of a venue', 'ix_show_venue_id_start_time',
+         Show.query.filter(Show.venue_id == 1, Show.start_time < now).
+         order_by(Show.start_time.desc(), Show.id.desc()).limit(11)),
+        ('upcoming shows', 'ix_show_start_time_id',
+         Show.query.filter(Show.start_time > now).order_by(Show.start_time, Show.id)),
+        ('venues in a city', 'ix_venue_city_state',
+         Venue.query.filter(Venue.city == 'San Francisco', Venue.state == 'CA')),
+        ('artists in a city', 'ix_artist_city_state',
+         Artist.query.filter(Artist.city == 'San Francisco', Artist.state == 'CA')),
+    ]
+
+
+def explain(query):
+    """Return the plan of query as text, using the database's EXPLAIN syntax."""
+    dialect = db.engine.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    connection = db.session.connection()
+    if dialect.name == 'postgresql':
+        # Tiny development tables are always cheaper to scan sequentially;
+        # forbid it so the plan shows which index would be picked.
+        connection.execute('SET LOCAL enable_seqscan = off')
+        rows = connection.execute('EXPLAIN ' + str(compiled), params)
+    else:
+        rows = connection.execute('EXPLAIN QUERY PLAN ' + str(compiled), params)
+    plan = '\n'.join(' '.join(str(column) for column in row) for row in rows)
+    db.session.rollback()
+    return plan
+
+
+def check_query_plans():
+    """EXPLAIN every indexed query and return (name, index, plan) for those
+    whose plan does not use the expected index."""
+    failures = []
+    for name, index, query in indexed_queries():
+        plan = explain(query)
+        if index not in plan:
+            failures.append((name, index, plan))
+    return failures
@@ -0,0 +1,93 @@
+import random
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy import SignallingSession, get_state
+from sqlalchemy import event
+
+
+#----------------------------------------------------------------------------#
+# Replica binds.
+#----------------------------------------------------------------------------#
+
+def replica_bind(index):
+    return 'replica_{}'.format(index)
+
+
+def register_replicas(app):
+    """Add every SQLALCHEMY_REPLICA_URIS entry to SQLALCHEMY_BINDS under
+    the replica_<n> bind keys."""
+    uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    for index, uri in enumerate(uris):
+        binds[replica_bind(index)] = uri
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def pinned_to_primary():
+    """Whether the client of this request is inside the read-your-writes
+    window of its last write."""
+    return has_request_context() and bool(current_app.config.get('SQLALCHEMY_REPLICA_URIS')) and \
+        session.get('read_primary_until', 0) > time.time()
+
+
+def choose_replica():
+    """Bind key of the replica this request should read from, or None to
+    stay on the primary: when there are no replicas, or while the client is
+    pinned to the primary."""
+    uris = current_app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    if not uris or pinned_to_primary():
+        return None
+    return replica_bind(random.randrange(len(uris)))
+
+
+#----------------------------------------------------------------------------#
+# Session.
+#----------------------------------------------------------------------------#
+
+class RoutingSession(SignallingSession):
+    """Session that runs the queries of read-only requests on the replica
+    picked for the request. Flushes, and everything outside a read-only
+    request, go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_request_context():
+            bind = g.get('read_replica')
+            if bind is not None:
+                return get_state(self.app).db.get_engine(self.app, bind=bind)
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def remember_write(session):
+    # Only writes commit; reads are rolled back when the session is removed.
+    if has_request_context():
+        g.db_written = True
+
+
+def read_only(view):
+    """Run the decorated view against a read replica, when one is configured."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = choose_replica()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    if app.config.get('SQLALCHEMY_REPLICA_URIS') and not app.config.get('SECRET_KEY'):
+        raise RuntimeError('Set SECRET_KEY in config.py: with SQLALCHEMY_REPLICA_URIS every process '
+                           'must read the read-your-writes window from the session cookie.')
+    register_replicas(app)
+
+    @app.after_request
+    def pin_to_primary(response):
+        # Send this client's reads to the primary until the replicas have
+        # had time to catch up with what it just wrote.
+        if g.get('db_written') and app.config.get('SQLALCHEMY_REPLICA_URIS'):
+            window = app.config.get('REPLICA_READ_YOUR_WRITES_SECONDS', 5)
+            session['read_primary_until'] = time.time() + window
+        return response
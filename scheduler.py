@@ -0,0 +1,147 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from instrumentation import Histogram, SECONDS_BUCKETS
+
+
+logger = logging.getLogger(__name__)
+
+
+#----------------------------------------------------------------------------#
+# Jobs.
+#----------------------------------------------------------------------------#
+
+class Job(object):
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+        self.last_error = None
+        self.runs = 0
+        self.failures = 0
+
+    def due(self, now):
+        return self.next_run is None or self.next_run <= now
+
+
+#----------------------------------------------------------------------------#
+# Backends.
+#----------------------------------------------------------------------------#
+
+class ThreadBackend(object):
+    """Runs due jobs from one daemon thread per process."""
+
+    def __init__(self, scheduler, tick=1.0):
+        self.scheduler = scheduler
+        self.tick = tick
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.loop, name='fyyur-scheduler', daemon=True)
+        self.thread.start()
+
+    def loop(self):
+        while not self.stopped.wait(self.tick):
+            self.scheduler.run_pending()
+
+    def stop(self):
+        self.stopped.set()
+
+
+# SCHEDULER_BACKEND names one of these, or is a class with the same interface.
+BACKENDS = {
+    'thread': ThreadBackend,
+}
+
+
+#----------------------------------------------------------------------------#
+# Scheduler.
+#----------------------------------------------------------------------------#
+
+class Scheduler(object):
+    """In-process scheduler of periodic jobs.
+
+    The backend is started by the first request, so CLI commands and
+    migrations never start it; jobs can always be run on demand with run().
+    Each run gets an app context, and its duration is recorded for /metrics.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.jobs = OrderedDict()
+        self.backend = None
+        self.lock = threading.Lock()
+        self.durations = Histogram('fyyur_job_duration_seconds', 'Run time of background jobs.',
+                                   SECONDS_BUCKETS + (30, 60, 300), label='job')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        backend = app.config.get('SCHEDULER_BACKEND', 'thread')
+        if backend:
+            backend_class = BACKENDS[backend] if isinstance(backend, str) else backend
+            self.backend = backend_class(self)
+            app.before_first_request(self.start)
+
+    def add_job(self, name, func, interval):
+        self.jobs[name] = Job(name, func, interval)
+
+    def start(self):
+        with self.lock:
+            if self.backend is not None and not getattr(self.backend, 'started', False):
+                self.backend.started = True
+                self.backend.start()
+
+    def stop(self):
+        if self.backend is not None:
+            self.backend.stop()
+
+    def run_pending(self):
+        now = time.monotonic()
+        for job in list(self.jobs.values()):
+            if job.interval and job.due(now):
+                job.next_run = now + job.interval
+                self.run(job.name)
+
+    def run(self, name):
+        """Run the job now and return its result (None if it failed)."""
+        job = self.jobs[name]
+        started = time.perf_counter()
+        result = None
+        try:
+            with self.app.app_context():
+                result = job.func()
+            job.last_error = None
+        except Exception as ex:
+            job.failures += 1
+            job.last_error = str(ex)
+            logger.exception('Job %s failed', name)
+        duration = time.perf_counter() - started
+        job.runs += 1
+        job.last_run = time.time()
+        job.last_duration = duration
+        self.durations.observe(name, duration)
+        logger.info('Job %s ran in %.1fms', name, duration * 1000,
+                    extra={'job': name, 'duration_ms': round(duration * 1000, 1), 'result': result})
+        return result
+
+    def render_metrics(self):
+        lines = self.durations.render()
+        lines += ['# TYPE fyyur_job_runs_total counter']
+        lines += ['fyyur_job_runs_total{{job="{}"}} {}'.format(job.name, job.runs) for job in self.jobs.values()]
+        lines += ['# TYPE fyyur_job_failures_total counter']
+        lines += ['fyyur_job_failures_total{{job="{}"}} {}'.format(job.name, job.failures) for job in self.jobs.values()]
+        lines += ['# TYPE fyyur_job_last_run_timestamp_seconds gauge']
+        lines += ['fyyur_job_last_run_timestamp_seconds{{job="{}"}} {:.0f}'.format(job.name, job.last_run)
+                  for job in self.jobs.values() if job.last_run is not None]
+        return '\n'.join(lines) + '\n'
+
+
+scheduler = Scheduler()
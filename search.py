@@ -0,0 +1,254 @@
+import re
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from models import db, Venue, Artist, Genre
+from routing import RoutingSession
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def tokenize(text):
+    return re.findall(r'\w+', (text or '').lower())
+
+
+def escape_like(term):
+    """term with its LIKE wildcards taken literally, for patterns used with
+    escape='\\'."""
+    return re.sub(r'([\\%_])', r'\\\1', term)
+
+
+def search_response(entities, total, page, per_page, serialize):
+    return {
+        'count': total,
+        'data': [serialize(entity) for entity in entities],
+        'page': page,
+        'next_page': page + 1 if page * per_page < total else None
+    }
+
+
+#----------------------------------------------------------------------------#
+# PostgreSQL backend.
+#----------------------------------------------------------------------------#
+
+class PostgresSearchBackend(object):
+    """Ranked search over the tsvector/pg_trgm indexes created by the
+    full text search migration."""
+
+    def __init__(self, model):
+        self.model = model
+        self.search_vector = db.literal_column('{}.search_vector'.format(model.__tablename__))
+
+    def _page(self, query, page, per_page):
+        rows = query.add_columns(db.func.count().over().label('total')).\
+            limit(per_page).offset((page - 1) * per_page).all()
+        total = rows[0].total if rows else 0
+        return [row[0] for row in rows], total
+
+    def search(self, term, page, per_page):
+        model = self.model
+        tokens = tokenize(term)
+        query = model.query
+        if not tokens:
+            return self._page(query.order_by(model.name, model.id), page, per_page)
+
+        # Every word is matched as a prefix so results show up while typing.
+        ts_query = db.func.to_tsquery('simple', ' & '.join(token + ':*' for token in tokens))
+        # Genres live in their own table, so they are matched as a whole
+        # term against the (small, indexed) genre names.
+        genre_match = model.genre_objects.any(Genre.name.ilike('{}%'.format(escape_like(term.strip())), escape='\\'))
+        rank = db.func.ts_rank(self.search_vector, ts_query) + db.func.similarity(model.name, term) + \
+            db.case([(genre_match, 0.2)], else_=0)
+        query = query.filter(db.or_(
+            self.search_vector.op('@@')(ts_query),
+            model.name.ilike('%{}%'.format(escape_like(term)), escape='\\'),
+            genre_match
+        )).order_by(rank.desc(), model.name, model.id)
+        return self._page(query, page, per_page)
+
+    def search_city_state(self, city, state, page, per_page):
+        model = self.model
+        query = model.query.filter(
+            model.city.ilike('%{}%'.format(escape_like(city)), escape='\\'),
+            model.state.ilike('%{}%'.format(escape_like(state)), escape='\\')
+        ).order_by(db.func.similarity(model.city, city).desc(), model.name, model.id)
+        return self._page(query, page, per_page)
+
+
+#----------------------------------------------------------------------------#
+# In-memory backend.
+#----------------------------------------------------------------------------#
+
+class InMemorySearchBackend(object):
+    """Token index kept in process, used on databases without tsvector
+    (SQLite during development and tests).
+
+    The index is rebuilt lazily from the table once a transaction that
+    inserted, updated or deleted the model commits.
+    """
+
+    # Name ranks above location, which ranks above genres, as in the
+    # PostgreSQL backend.
+    WEIGHTS = (('name', 1.0), ('city', 0.4), ('state', 0.4), ('genres', 0.2))
+
+    def __init__(self, model):
+        self.model = model
+        self.documents = None
+        self.lock = threading.Lock()
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, self.written)
+
+    def written(self, mapper, connection, target):
+        # Flushed but not committed yet, so other sessions cannot see the
+        # change: dropping the index now would let them rebuild it without.
+        object_session(target).info.setdefault('search_written', set()).add(self)
+
+    def invalidate(self):
+        # Waits for a rebuild in progress, which may have read the rows from
+        # before the commit.
+        with self.lock:
+            self.documents = None
+
+    def _documents(self):
+        documents = self.documents
+        if documents is None:
+            with self.lock:
+                if self.documents is None:
+                    model = self.model
+                    genres = {}
+                    for entity_id, genre in db.session.query(model.id, Genre.name).join(model.genre_objects):
+                        genres.setdefault(entity_id, []).append(genre)
+
+                    rows = db.session.query(model.id, model.name, model.city, model.state).all()
+                    self.documents = []
+                    for row in rows:
+                        values = dict(row._asdict(), genres=' '.join(genres.get(row.id, [])))
+                        self.documents.append({
+                            'id': row.id,
+                            'name': (row.name or '').lower(),
+                            'city': (row.city or '').lower(),
+                            'state': (row.state or '').lower(),
+                            'fields': [(tokenize(values[field]), weight) for field, weight in self.WEIGHTS]
+                        })
+                documents = self.documents
+        return documents
+
+    def _score(self, document, tokens, term):
+        score = 0.0
+        for token in tokens:
+            best = max(
+                [weight for words, weight in document['fields'] if any(word.startswith(token) for word in words)] or [0]
+            )
+            if not best:
+                score = 0.0
+                break
+            score += best
+        if term and term in document['name']:
+            score += 0.5
+        return score
+
+    def _page(self, ranked, page, per_page):
+        total = len(ranked)
+        ids = [document['id'] for document in ranked[(page - 1) * per_page:page * per_page]]
+        entities = {entity.id: entity for entity in self.model.query.filter(self.model.id.in_(ids))} if ids else {}
+        return [entities[entity_id] for entity_id in ids if entity_id in entities], total
+
+    def search(self, term, page, per_page):
+        term = (term or '').strip().lower()
+        tokens = tokenize(term)
+        documents = self._documents()
+        if not tokens:
+            ranked = sorted(documents, key=lambda document: (document['name'], document['id']))
+            return self._page(ranked, page, per_page)
+
+        scored = [(self._score(document, tokens, term), document) for document in documents]
+        ranked = [document for score, document in sorted(
+            (item for item in scored if item[0] > 0),
+            key=lambda item: (-item[0], item[1]['name'], item[1]['id'])
+        )]
+        return self._page(ranked, page, per_page)
+
+    def search_city_state(self, city, state, page, per_page):
+        city, state = city.lower(), state.lower()
+        ranked = sorted(
+            (document for document in self._documents() if city in document['city'] and state in document['state']),
+            key=lambda document: (document['name'], document['id'])
+        )
+        return self._page(ranked, page, per_page)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def invalidate_written(session):
+    for backend in session.info.pop('search_written', ()):
+        backend.invalidate()
+
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def forget_written(session):
+    session.info.pop('search_written', None)
+
+
+#----------------------------------------------------------------------------#
+# Public API.
+#----------------------------------------------------------------------------#
+
+BACKENDS = {
+    'postgres': PostgresSearchBackend,
+    'memory': InMemorySearchBackend,
+}
+
+_backends = {}
+
+
+def get_backend(model):
+    """Return the search backend for model, picked from SEARCH_BACKEND
+    ('auto', 'postgres' or 'memory'). 'auto' uses PostgreSQL when the
+    database is PostgreSQL and the in-memory index otherwise."""
+    from flask import current_app
+
+    name = current_app.config.get('SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'postgres' if db.engine.dialect.name == 'postgresql' else 'memory'
+    key = (name, model)
+    if key not in _backends:
+        _backends[key] = BACKENDS[name](model)
+    return _backends[key]
+
+
+def invalidate():
+    """Drop the in-memory indexes after writes that bypass the ORM events
+    (bulk inserts)."""
+    for backend in _backends.values():
+        if isinstance(backend, InMemorySearchBackend):
+            backend.invalidate()
+
+
+def split_city_state(search_term):
+    city, _, state = search_term.partition(',')
+    return city.strip(), state.strip()
+
+
+def search_venues(term, page=1, per_page=20):
+    venues, total = get_backend(Venue).search(term, page, per_page)
+    return search_response(venues, total, page, per_page, lambda venue: venue.venue_details)
+
+
+def search_artists(term, page=1, per_page=20):
+    artists, total = get_backend(Artist).search(term, page, per_page)
+    return search_response(artists, total, page, per_page, lambda artist: artist.artist_details)
+
+
+def search_venues_by_city_state(search_term, page=1, per_page=20):
+    city, state = split_city_state(search_term)
+    venues, total = get_backend(Venue).search_city_state(city, state, page, per_page)
+    return search_response(venues, total, page, per_page, lambda venue: venue.venue_details)
+
+
+def search_artists_by_city_state(search_term, page=1, per_page=20):
+    city, state = split_city_state(search_term)
+    artists, total = get_backend(Artist).search_city_state(city, state, page, per_page)
+    return search_response(artists, total, page, per_page, lambda artist: artist.artist_details)
@@ -0,0 +1,74 @@
+import hashlib
+import os
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from cache import create_backend
+
+
+#----------------------------------------------------------------------------#
+# Fragment cache.
+#----------------------------------------------------------------------------#
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, ... %}...{% endcache %} renders its body once per key
+    and then serves it from environment.fragment_cache.
+
+    Keys should include the version (updated_at) of everything the body
+    shows, so entries never need invalidating; the TTL only bounds memory.
+    """
+
+    tags = {'cache'}
+
+    def __init__(self, environment):
+        super(FragmentCacheExtension, self).__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_cached', [nodes.List(args)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _cached(self, key, caller):
+        cache = self.environment.fragment_cache
+        if cache is None:
+            return caller()
+        key = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        fragment = cache.get(key)
+        if fragment is None:
+            fragment = str(caller())
+            cache.set(key, fragment)
+        return Markup(fragment)
+
+
+#----------------------------------------------------------------------------#
+# Setup.
+#----------------------------------------------------------------------------#
+
+def init_app(app):
+    env = app.jinja_env
+    directory = app.config.get('TEMPLATE_BYTECODE_CACHE_DIR')
+    if directory:
+        # Compiled templates are shared by every worker using the directory.
+        os.makedirs(directory, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(directory)
+
+    env.add_extension(FragmentCacheExtension)
+    if app.config.get('FRAGMENT_CACHE_ENABLED', True):
+        env.fragment_cache = create_backend(app, app.config.get('FRAGMENT_CACHE_SIZE', 4096),
+                                            app.config.get('FRAGMENT_CACHE_TTL', 300),
+                                            prefix='fyyur-fragment:')
+
+
+def compile_templates(app):
+    """Load every template, filling the bytecode cache. Returns their names."""
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return names
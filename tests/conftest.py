@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app as fyyur_app
+from cache import detail_cache, recent_feed
+from models import db
+from scheduler import scheduler
+import search
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """The app on an empty SQLite database in tmp_path, with every
+    in-process cache emptied."""
+    monkeypatch.setitem(fyyur_app.config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / 'fyyur.db'))
+    monkeypatch.setitem(fyyur_app.config, 'TESTING', True)
+    monkeypatch.setitem(fyyur_app.config, 'WTF_CSRF_ENABLED', False)
+    # The jobs would otherwise run against the test database in the background.
+    scheduler.stop()
+
+    with fyyur_app.app_context():
+        db.create_all()
+    detail_cache.clear()
+    recent_feed.venues.clear()
+    recent_feed.artists.clear()
+    if fyyur_app.jinja_env.fragment_cache is not None:
+        fyyur_app.jinja_env.fragment_cache.clear()
+    search.invalidate()
+
+    yield fyyur_app
+
+    with fyyur_app.app_context():
+        db.session.remove()
+        db.get_engine().dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
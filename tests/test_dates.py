@@ -0,0 +1,37 @@
+import datetime
+import os
+import time
+
+import pytest
+
+from dates import format_datetime
+
+
+@pytest.fixture
+def new_york():
+    saved = os.environ.get('TZ')
+    os.environ['TZ'] = 'America/New_York'
+    time.tzset()
+    yield
+    if saved is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = saved
+    time.tzset()
+
+
+def test_naive_times_render_as_stored_by_default(app):
+    with app.test_request_context():
+        assert format_datetime(datetime.datetime(2035, 4, 1, 20, 0), 'HH:mm') == '20:00'
+
+
+def test_naive_times_are_taken_as_server_local_time(app, new_york):
+    app.config['DATETIME_DISPLAY_TIMEZONE'] = 'UTC'
+    with app.test_request_context():
+        assert format_datetime(datetime.datetime(2035, 4, 1, 20, 0), 'HH:mm') == '00:00'
+
+
+def test_storage_timezone_overrides_server_local_time(app, new_york):
+    app.config.update(DATETIME_DISPLAY_TIMEZONE='America/Chicago', DATETIME_STORAGE_TIMEZONE='UTC')
+    with app.test_request_context():
+        assert format_datetime(datetime.datetime(2035, 4, 1, 20, 0), 'HH:mm') == '15:00'
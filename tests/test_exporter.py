@@ -0,0 +1,24 @@
+import pytest
+
+from exporter import export_rows, export_types, write_parquet
+from models import db, Venue
+
+pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+
+
+def test_parquet_batch_starting_with_nulls(app, tmp_path):
+    with app.app_context():
+        db.session.add(Venue(name='Sparse', city='San Francisco', state='CA'))
+        db.session.add(Venue(name='Full', city='San Francisco', state='CA', website='https://example.com',
+                             seeking_talent=True, seeking_description='Jazz bands', genres=['Jazz']))
+        db.session.commit()
+
+        columns, rows = export_rows('venues')
+        path = str(tmp_path / 'venues.parquet')
+        write_parquet(columns, export_types('venues'), rows, path, batch_size=1)
+
+    table = pyarrow_parquet.read_table(path)
+    assert table.num_rows == 2
+    assert table.column('genres').to_pylist() == [None, 'Jazz']
+    assert table.column('website').to_pylist() == [None, 'https://example.com']
+    assert table.column('seeking_description').to_pylist() == [None, 'Jazz bands']
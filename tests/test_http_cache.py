@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmark import generate
+from models import db, Venue, Show
+
+
+@pytest.fixture
+def seeded(app):
+    with app.app_context():
+        generate(venues=5, artists=5, shows=20, cities=2, seed=1)
+    return app
+
+
+def test_matching_etag_is_not_modified(seeded):
+    client = seeded.test_client()
+    first = client.get('/venues')
+    assert first.status_code == 200 and first.headers['ETag']
+
+    again = client.get('/venues', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+    assert again.get_data() == b''
+    assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_if_modified_since(seeded):
+    client = seeded.test_client()
+    last_modified = client.get('/shows').headers['Last-Modified']
+    assert client.get('/shows', headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get('/shows', headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+
+
+def test_delete_changes_the_version(seeded):
+    client = seeded.test_client()
+    etag = client.get('/venues').headers['ETag']
+    with seeded.app_context():
+        Show.query.filter(Show.venue_id == 5).delete()
+        db.session.commit()
+        Venue.query.get(5).delete()
+
+    response = client.get('/venues', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_added_show_changes_the_listings(seeded):
+    client = seeded.test_client()
+    etags = {path: client.get(path).headers['ETag'] for path in ('/shows', '/venues', '/artists')}
+    with seeded.app_context():
+        Show(venue_id=1, artist_id=1, start_time=datetime.datetime.now() + datetime.timedelta(days=1)).add()
+
+    for path, etag in etags.items():
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 200, path
+
+
+def test_not_modified_costs_one_lookup(seeded):
+    client = seeded.test_client()
+    etag = client.get('/shows').headers['ETag']
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        assert client.get('/shows', headers={'If-None-Match': etag}).status_code == 304
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    assert len(statements) == 1
+    assert 'table_version' in statements[0]
@@ -0,0 +1,78 @@
+import json
+
+from api import import_tokens
+from importer import IMPORTERS, import_rows
+from models import db, Venue, Artist, Show
+
+
+LINKS = {'image_link': 'https://example.com/image.jpg', 'facebook_link': 'https://www.facebook.com/example',
+         'website': 'https://example.com'}
+
+VENUE_ROW = dict(LINKS, name='The Musical Hop', city='San Francisco', state='CA', address='1015 Folsom Street',
+                 phone='1231231234', genres='Jazz', seeking_talent='False')
+
+ARTIST_ROW = dict(LINKS, name='Guns N Petals', city='San Francisco', state='CA', phone='3261235000',
+                  genres='Rock n Roll', seeking_venue='False')
+
+
+def seed(app):
+    with app.app_context():
+        assert import_rows('venues', enumerate([VENUE_ROW], 1))['inserted'] == 1
+        assert import_rows('artists', enumerate([ARTIST_ROW], 1))['inserted'] == 1
+
+
+def test_show_without_start_time_is_rejected(app):
+    seed(app)
+    with app.app_context():
+        result = import_rows('shows', enumerate([{'venue_id': '1', 'artist_id': '1'}], 1))
+        assert result['inserted'] == 0
+        assert result['errors'] == [{'line': 1, 'errors': {'start_time': ['This field is required.']}}]
+        assert Show.query.count() == 0
+
+
+def test_show_with_start_time_is_imported(app):
+    seed(app)
+    with app.app_context():
+        row = {'venue_id': '1', 'artist_id': '1', 'start_time': '2035-04-01 20:00:00'}
+        assert import_rows('shows', enumerate([row], 1))['inserted'] == 1
+        assert str(db.session.query(Show.start_time).scalar()) == '2035-04-01 20:00:00'
+
+
+def test_show_import_recounts_only_the_touched_entities(app):
+    seed(app)
+    with app.app_context():
+        assert import_rows('venues', enumerate([dict(VENUE_ROW, name='Stale Counters')], 1))['inserted'] == 1
+        Venue.query.filter(Venue.id == 2).update({Venue.past_shows_count: 7})
+        db.session.commit()
+
+        rows = [{'venue_id': '1', 'artist_id': '1', 'start_time': start_time}
+                for start_time in ('2035-04-01 20:00:00', '2001-04-01 20:00:00')]
+        assert import_rows('shows', enumerate(rows, 1))['inserted'] == 2
+        venues = {venue.id: (venue.upcoming_shows_count, venue.past_shows_count) for venue in Venue.query}
+        assert venues == {1: (1, 1), 2: (0, 7)}
+        assert (Artist.query.get(1).upcoming_shows_count, Artist.query.get(1).past_shows_count) == (1, 1)
+
+
+def test_database_errors_are_not_sent_to_the_client(app, monkeypatch):
+    seed(app)
+
+    def fail(rows):
+        raise Exception('relation "show" violates secret_constraint')
+    monkeypatch.setattr(IMPORTERS['shows'], 'insert', fail)
+    with app.app_context():
+        row = {'venue_id': '1', 'artist_id': '1', 'start_time': '2035-04-01 20:00:00'}
+        result = import_rows('shows', enumerate([row], 1))
+    assert result['errors'] == [{'line': 1, 'errors': {'database': ['The batch could not be inserted.']}}]
+
+
+def test_import_endpoint_needs_a_token(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'IMPORT_SECRET', 'import-secret')
+    client = app.test_client()
+    body = json.dumps(VENUE_ROW) + '\n'
+
+    assert client.post('/api/v1/import/venues?format=jsonl', data=body).status_code == 404
+    assert client.post('/api/v1/import/venues?format=jsonl', data=body,
+                       headers={'X-Fyyur-Import': 'forged'}).status_code == 404
+    response = client.post('/api/v1/import/venues?format=jsonl', data=body,
+                           headers={'X-Fyyur-Import': import_tokens.make_token(app)})
+    assert response.get_json() == {'inserted': 1, 'errors': []}
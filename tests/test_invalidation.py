@@ -0,0 +1,73 @@
+import datetime
+
+import pytest
+
+from cache import detail_cache, venue_key, artist_key
+from models import db, Venue, Artist, Show
+
+
+KEYS = [venue_key(index) for index in (1, 2, 3)] + [artist_key(index) for index in (1, 2, 3)]
+
+# (venue, artist) of each show.
+SHOWS = ((1, 1), (1, 2), (2, 3))
+
+
+@pytest.fixture
+def cached(app):
+    with app.app_context():
+        for index in (1, 2, 3):
+            db.session.add(Venue(id=index, name='Venue {}'.format(index)))
+            db.session.add(Artist(id=index, name='Artist {}'.format(index)))
+        for show_id, (venue_id, artist_id) in enumerate(SHOWS, 1):
+            db.session.add(Show(id=show_id, venue_id=venue_id, artist_id=artist_id,
+                                start_time=datetime.datetime.now() + datetime.timedelta(days=1)))
+        db.session.commit()
+    for key in KEYS:
+        detail_cache.set(key, {'cached': key})
+    return app
+
+
+def dropped():
+    return {key for key in KEYS if detail_cache.backend.get(key) is None}
+
+
+def test_renaming_a_venue_drops_it_and_its_artists(cached):
+    with cached.app_context():
+        venue = Venue.query.get(1)
+        venue.name = 'Renamed'
+        venue.update()
+    assert dropped() == {'venue:1', 'artist:1', 'artist:2'}
+
+
+def test_renaming_an_artist_drops_it_and_its_venues(cached):
+    with cached.app_context():
+        artist = Artist.query.get(3)
+        artist.name = 'Renamed'
+        artist.update()
+    assert dropped() == {'artist:3', 'venue:2'}
+
+
+def test_deleting_a_venue_drops_it_and_its_artists(cached):
+    with cached.app_context():
+        Venue.query.get(2).delete()
+    assert dropped() == {'venue:2', 'artist:3'}
+
+
+def test_adding_a_show_drops_both_sides(cached):
+    with cached.app_context():
+        Show(venue_id=3, artist_id=1, start_time=datetime.datetime.now()).add()
+    assert dropped() == {'venue:3', 'artist:1'}
+
+
+def test_moving_a_show_drops_the_old_and_new_sides(cached):
+    with cached.app_context():
+        show = Show.query.get(2)
+        show.venue_id = 3
+        show.update()
+    assert dropped() == {'venue:1', 'venue:3', 'artist:2'}
+
+
+def test_deleting_a_show_drops_both_sides(cached):
+    with cached.app_context():
+        Show.query.get(3).delete()
+    assert dropped() == {'venue:2', 'artist:3'}
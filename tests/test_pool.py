@@ -0,0 +1,48 @@
+import sqlite3
+import time
+
+import pytest
+from sqlalchemy import exc
+
+from pool import TimedQueuePool, TimedNullPool, pool_metrics
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    pool_metrics.reset()
+    yield pool_metrics
+    pool_metrics.reset()
+
+
+def slow_connect():
+    time.sleep(0.05)
+    return sqlite3.connect(':memory:', check_same_thread=False)
+
+
+def refused():
+    raise sqlite3.OperationalError('connection refused')
+
+
+def test_connect_time_is_not_wait_time(metrics):
+    pool = TimedNullPool(slow_connect)
+    pool.connect().close()
+    snapshot = metrics.snapshot()
+    assert (snapshot['checkouts'], snapshot['connects']) == (1, 1)
+    assert snapshot['connect_seconds_total'] >= 0.05
+    assert snapshot['wait_seconds_total'] < 0.05
+
+
+def test_failed_connect_is_not_a_timeout(metrics):
+    pool = TimedQueuePool(refused, pool_size=1, max_overflow=0)
+    with pytest.raises(sqlite3.OperationalError):
+        pool.connect()
+    assert metrics.snapshot()['timeouts'] == 0
+
+
+def test_exhausted_pool_times_out(metrics):
+    pool = TimedQueuePool(slow_connect, pool_size=1, max_overflow=0, timeout=0.01)
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    held.close()
+    assert metrics.snapshot()['timeouts'] == 1
@@ -0,0 +1,31 @@
+from collections import deque
+
+import pytest
+
+from profiling import make_token, request_profiler
+
+
+@pytest.fixture
+def profiling(app, tmp_path, monkeypatch):
+    """Every request profiled into tmp_path, keeping the last two."""
+    monkeypatch.setitem(app.config, 'PROFILING_ENABLED', True)
+    monkeypatch.setitem(app.config, 'PROFILING_SECRET', 'test-secret')
+    monkeypatch.setitem(app.config, 'PROFILING_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setattr(request_profiler, 'recent', deque(maxlen=2))
+    return app
+
+
+def test_only_the_listed_profiles_stay_on_disk(profiling, tmp_path):
+    client = profiling.test_client()
+    for _ in range(5):
+        client.get('/venues')
+
+    names = sorted(entry['name'] for entry in request_profiler.recent)
+    files = sorted(path.name for path in (tmp_path / 'profiles').iterdir())
+    assert files == sorted(name + suffix for name in names for suffix in ('.prof', '.sql.json'))
+
+
+def test_admin_page_needs_the_token_even_when_profiling_everything(profiling):
+    client = profiling.test_client()
+    assert client.get('/admin/profiles/').status_code == 404
+    assert client.get('/admin/profiles/', headers={'X-Fyyur-Profile': make_token(profiling)}).status_code == 200
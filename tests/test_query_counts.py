@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmark import clear_caches, generate
+from models import db
+
+
+PAGES = ('/shows', '/venues/1', '/artists/1')
+
+SHOWS = 40
+
+
+def statement_counts(app, tmp_path, monkeypatch, shows):
+    """Statements run by each page of a database holding shows shows."""
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_DATABASE_URI', 'sqlite:///' + str(tmp_path / '{}.db'.format(shows)))
+    with app.app_context():
+        db.create_all()
+        generate(venues=5, artists=5, shows=shows, cities=2, seed=1)
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    client = app.test_client()
+    counts = {}
+    event.listen(Engine, 'before_cursor_execute', count)
+    try:
+        for path in PAGES:
+            clear_caches(app)
+            del statements[:]
+            assert client.get(path).status_code == 200
+            counts[path] = len(statements)
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count)
+    return counts
+
+
+def test_statement_count_does_not_grow_with_the_shows(app, tmp_path, monkeypatch):
+    assert statement_counts(app, tmp_path, monkeypatch, SHOWS) == \
+        statement_counts(app, tmp_path, monkeypatch, SHOWS * 10)
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_pages_render_shows(app, tmp_path, monkeypatch, path):
+    # Guards the test above against comparing pages that list nothing.
+    statement_counts(app, tmp_path, monkeypatch, SHOWS)
+    assert 'tile-show' in app.test_client().get(path).get_data(as_text=True)
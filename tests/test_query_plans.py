@@ -0,0 +1,6 @@
+from query_plans import check_query_plans
+
+
+def test_hot_queries_use_their_indexes(app):
+    with app.app_context():
+        assert check_query_plans() == []
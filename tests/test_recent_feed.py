@@ -0,0 +1,48 @@
+import datetime
+
+import pytest
+
+from cache import recent_feed
+from models import db, Venue, Artist, Show
+
+
+@pytest.fixture
+def feed(app):
+    with app.app_context():
+        for index in (1, 2):
+            db.session.add(Venue(id=index, name='Venue {}'.format(index)))
+            db.session.add(Artist(id=index, name='Artist {}'.format(index)))
+        db.session.commit()
+    app.test_client().get('/')
+    return app
+
+
+def test_show_writes_keep_the_feed(feed):
+    items = recent_feed.venues.items
+    with feed.app_context():
+        Show(venue_id=1, artist_id=1, start_time=datetime.datetime.now() + datetime.timedelta(days=1)).add()
+    feed.test_client().get('/')
+    assert recent_feed.venues.items is items
+
+
+def test_renamed_venue_reloads_the_feed(feed):
+    with feed.app_context():
+        venue = Venue.query.get(2)
+        venue.name = 'Renamed'
+        venue.update()
+    assert 'Renamed' in feed.test_client().get('/').get_data(as_text=True)
+
+
+def test_write_from_another_process_reloads_the_feed(feed):
+    with feed.app_context():
+        # Bypasses every in-process hook, as another worker's write would.
+        db.session.execute(Artist.__table__.update().where(Artist.id == 1).values(
+            name='Elsewhere', updated_at=datetime.datetime.utcnow()))
+        db.session.commit()
+    assert 'Elsewhere' in feed.test_client().get('/').get_data(as_text=True)
+
+
+def test_deleted_venue_leaves_the_feed(feed):
+    with feed.app_context():
+        Venue.query.get(2).delete()
+    assert 'Venue 2' not in feed.test_client().get('/').get_data(as_text=True)
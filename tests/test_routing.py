@@ -0,0 +1,116 @@
+import shutil
+
+import pytest
+from flask import Flask, jsonify
+
+import routing
+from models import db, Venue
+
+
+VENUE_FORM = {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'CA', 'address': '1015 Folsom Street',
+    'phone': '123-123-1234', 'genres': ['Jazz'], 'image_link': 'https://example.com/hop.jpg',
+    'facebook_link': 'https://www.facebook.com/TheMusicalHop', 'website': 'https://www.themusicalhop.com',
+}
+
+
+@pytest.fixture
+def replicated(app, tmp_path, monkeypatch):
+    """A primary and a replica SQLite file holding the same venue. Nothing
+    replicates, so the replica lags behind every write."""
+    with app.app_context():
+        db.session.add(Venue(**dict(VENUE_FORM, name='Old Name')))
+        db.session.commit()
+        db.get_engine().dispose()
+    shutil.copy(str(tmp_path / 'fyyur.db'), str(tmp_path / 'replica.db'))
+
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_REPLICA_URIS', ['sqlite:///' + str(tmp_path / 'replica.db')])
+    monkeypatch.setitem(app.config, 'SQLALCHEMY_BINDS', None)
+    routing.register_replicas(app)
+    yield app
+    with app.app_context():
+        db.get_engine(app, bind=routing.replica_bind(0)).dispose()
+
+
+def venue_name(client, venue_id=1):
+    return client.get('/api/v1/venues/{}'.format(venue_id)).get_json()['name']
+
+
+def edit_venue(client, name):
+    client.post('/venues/1/edit', data=dict(VENUE_FORM, name=name))
+
+
+def test_reads_use_the_replica_and_writes_the_primary(replicated):
+    client = replicated.test_client()
+    with replicated.app_context():
+        Venue.query.get(1).name = 'Primary Only'
+        db.session.commit()
+
+    assert venue_name(client) == 'Old Name'
+
+    edit_venue(client, 'Edited')
+    with replicated.app_context():
+        assert Venue.query.get(1).name == 'Edited'
+
+
+def test_writer_reads_the_primary_until_the_window_ends(replicated):
+    writer = replicated.test_client()
+    edit_venue(writer, 'Edited')
+    assert venue_name(writer) == 'Edited'
+
+    with writer.session_transaction() as session:
+        session['read_primary_until'] = 0
+    assert venue_name(writer) == 'Old Name'
+
+
+def test_other_clients_stay_on_the_replica(replicated):
+    edit_venue(replicated.test_client(), 'Edited')
+    assert venue_name(replicated.test_client()) == 'Old Name'
+
+
+def test_writer_does_not_get_a_copy_cached_from_the_replica(replicated):
+    writer, reader = replicated.test_client(), replicated.test_client()
+    edit_venue(writer, 'Edited')
+
+    # The reader re-caches the page from the lagging replica.
+    assert venue_name(reader) == 'Old Name'
+    assert 'Old Name' in reader.get('/venues/1').get_data(as_text=True)
+
+    assert venue_name(writer) == 'Edited'
+    writer.get('/venues/1')  # consumes the flashed message
+    assert 'Edited' in writer.get('/venues/1').get_data(as_text=True)
+
+
+def other_worker(secret_key):
+    """Another process of the deployment, reduced to the replica routing."""
+    worker = Flask('other_worker')
+    worker.config.update(SECRET_KEY=secret_key, SQLALCHEMY_REPLICA_URIS=['sqlite://'])
+    routing.init_app(worker)
+
+    @worker.route('/pinned')
+    def pinned():
+        return jsonify(routing.pinned_to_primary())
+    return worker
+
+
+def pinned_in(worker, writer):
+    """Whether worker pins writer to the primary, given writer's session cookie."""
+    client = worker.test_client()
+    cookie = next(cookie for cookie in writer.cookie_jar if cookie.name == 'session')
+    client.set_cookie('localhost', cookie.name, cookie.value)
+    return client.get('/pinned').get_json()
+
+
+def test_other_workers_read_the_pin(replicated, monkeypatch):
+    monkeypatch.setitem(replicated.config, 'SECRET_KEY', 'shared-secret')
+    writer = replicated.test_client()
+    edit_venue(writer, 'Edited')
+
+    assert pinned_in(other_worker('shared-secret'), writer) is True
+    # What a per-process random key did: the other worker cannot read it.
+    assert pinned_in(other_worker('another-secret'), writer) is False
+
+
+def test_replicas_need_a_secret_key():
+    with pytest.raises(RuntimeError):
+        other_worker(None)
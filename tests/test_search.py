@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+import search
+from models import db, Venue
+
+
+VENUES = (
+    # name, city, state, genres
+    ('Jazz Corner', 'Boston', 'MA', ['Rock n Roll']),
+    ('The Blue Room', 'Jazzville', 'TX', ['Folk']),
+    ('Park Square Live Music & Coffee', 'San Francisco', 'CA', ['Jazz']),
+    ('The Musical Hop', 'San Francisco', 'CA', ['Swing']),
+    ('100% Vinyl', 'South San Francisco', 'CA', ['Soul']),
+)
+
+
+@pytest.fixture
+def venues(app):
+    with app.app_context():
+        for name, city, state, genres in VENUES:
+            db.session.add(Venue(name=name, city=city, state=state, genres=genres))
+        db.session.commit()
+    return app
+
+
+def names(result):
+    return [venue['name'] for venue in result['data']]
+
+
+def test_sqlite_uses_the_in_memory_index(venues):
+    with venues.app_context():
+        assert isinstance(search.get_backend(Venue), search.InMemorySearchBackend)
+
+
+def test_name_ranks_above_city_above_genre(venues):
+    with venues.app_context():
+        result = search.search_venues('jazz')
+    assert names(result) == ['Jazz Corner', 'The Blue Room', 'Park Square Live Music & Coffee']
+    assert result['count'] == 3
+
+
+def test_partial_case_insensitive_match(venues):
+    with venues.app_context():
+        assert names(search.search_venues('MUSIC')) == ['Park Square Live Music & Coffee', 'The Musical Hop']
+
+
+def test_city_state_search(venues):
+    with venues.app_context():
+        result = search.search_venues_by_city_state('san francisco, ca')
+    assert names(result) == ['100% Vinyl', 'Park Square Live Music & Coffee', 'The Musical Hop']
+
+
+def test_paging(venues):
+    with venues.app_context():
+        first = search.search_venues_by_city_state('san francisco, ca', page=1, per_page=2)
+        second = search.search_venues_by_city_state('san francisco, ca', page=2, per_page=2)
+    assert (first['count'], first['next_page'], second['next_page']) == (3, 2, None)
+    assert names(second) == ['The Musical Hop']
+
+
+def test_like_wildcards_are_escaped():
+    assert search.escape_like('100%_off\\') == '100\\%\\_off\\\\'
+
+
+def test_index_is_dropped_on_commit_not_on_flush(venues):
+    with venues.app_context():
+        assert names(search.search_venues('hideout')) == []
+
+        db.session.add(Venue(name='The Hideout', city='Chicago', state='IL'))
+        db.session.flush()
+
+        # Another request rebuilds the index before the write commits.
+        def rebuild():
+            with venues.app_context():
+                search.get_backend(Venue).invalidate()
+                assert names(search.search_venues('hideout')) == []
+        thread = threading.Thread(target=rebuild)
+        thread.start()
+        thread.join()
+
+        db.session.commit()
+        assert names(search.search_venues('hideout')) == ['The Hideout']
+
+
+def test_rolled_back_write_keeps_the_index(venues):
+    with venues.app_context():
+        search.search_venues('jazz')
+        db.session.add(Venue(name='Never Committed', city='Chicago', state='IL'))
+        db.session.flush()
+        db.session.rollback()
+        assert search.get_backend(Venue).documents is not None
@@ -0,0 +1,106 @@
+import datetime
+import types
+
+import pytest
+
+import jobs
+from models import db, Venue, Artist, Show
+
+
+HOUR = datetime.timedelta(hours=1)
+
+
+@pytest.fixture
+def entities(app):
+    with app.app_context():
+        for index in (1, 2):
+            db.session.add(Venue(id=index, name='Venue {}'.format(index)))
+            db.session.add(Artist(id=index, name='Artist {}'.format(index)))
+        db.session.commit()
+    return app
+
+
+def counts(model, entity_id):
+    entity = db.session.query(model).populate_existing().get(entity_id)
+    return entity.upcoming_shows_count, entity.past_shows_count
+
+
+def add_show(start_time, venue_id=1, artist_id=1):
+    show = Show(venue_id=venue_id, artist_id=artist_id, start_time=start_time)
+    show.add()
+    return show
+
+
+def test_add_counts_upcoming_and_past(entities):
+    with entities.app_context():
+        add_show(datetime.datetime.now() + HOUR)
+        add_show(datetime.datetime.now() - HOUR)
+        assert counts(Venue, 1) == (1, 1)
+        assert counts(Artist, 1) == (1, 1)
+        assert counts(Venue, 2) == (0, 0)
+
+
+def test_delete_uncounts(entities):
+    with entities.app_context():
+        show = add_show(datetime.datetime.now() + HOUR)
+        show.delete()
+        assert counts(Venue, 1) == (0, 0)
+        assert counts(Artist, 1) == (0, 0)
+
+
+def test_deleting_a_venue_deletes_its_shows_and_recounts_their_artists(entities):
+    with entities.app_context():
+        add_show(datetime.datetime.now() + HOUR, venue_id=1, artist_id=1)
+        add_show(datetime.datetime.now() + HOUR, venue_id=2, artist_id=1)
+        Venue.query.get(1).delete()
+        assert Show.query.count() == 1
+        assert counts(Artist, 1) == (1, 0)
+
+
+def test_update_moving_a_show_recounts_both_sides(entities):
+    with entities.app_context():
+        show = add_show(datetime.datetime.now() + HOUR)
+        show.venue_id = 2
+        show.artist_id = 2
+        show.update()
+        assert (counts(Venue, 1), counts(Venue, 2)) == ((0, 0), (1, 0))
+        assert (counts(Artist, 1), counts(Artist, 2)) == ((0, 0), (1, 0))
+
+
+def test_rescheduled_show_changes_bucket(entities):
+    with entities.app_context():
+        show = add_show(datetime.datetime.now() + HOUR)
+        show.start_time = datetime.datetime.now() - HOUR
+        show.update()
+        assert counts(Venue, 1) == (0, 1)
+
+
+class Clock(datetime.datetime):
+    current = None
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def test_refresh_rebuckets_shows_that_started_since_the_last_run(entities, monkeypatch):
+    monkeypatch.setattr(jobs, 'datetime', types.SimpleNamespace(datetime=Clock, timedelta=datetime.timedelta))
+    start = datetime.datetime.now()
+    refresh = jobs.RefreshShowCounts()
+    with entities.app_context():
+        add_show(start + HOUR)
+        # Stale counters outside the window are left to a full refresh.
+        Venue.query.filter(Venue.id == 2).update({Venue.upcoming_shows_count: 5})
+        db.session.commit()
+
+        Clock.current = start
+        refresh()
+        assert counts(Venue, 2) == (0, 0)  # the first run refreshes everything
+
+        Venue.query.filter(Venue.id == 2).update({Venue.upcoming_shows_count: 5})
+        db.session.commit()
+        Clock.current = start + 2 * HOUR
+        assert refresh() == 2
+        assert counts(Venue, 1) == (0, 1)
+        assert counts(Artist, 1) == (0, 1)
+        assert counts(Venue, 2) == (5, 0)
@@ -0,0 +1,40 @@
+from flask import request
+from itsdangerous import TimestampSigner, BadSignature
+
+
+class TokenGate(object):
+    """Signed, expiring tokens that open an operator only feature to whoever
+    holds one, configured by <prefix>_SECRET (the same in every process),
+    <prefix>_HEADER and <prefix>_TOKEN_MAX_AGE."""
+
+    def __init__(self, prefix, purpose, header, query_arg=None):
+        self.prefix = prefix
+        self.purpose = purpose
+        self.header = header
+        self.query_arg = query_arg
+
+    def secret(self, app):
+        return app.config.get(self.prefix + '_SECRET')
+
+    def header_name(self, app):
+        return app.config.get(self.prefix + '_HEADER', self.header)
+
+    def signer(self, app):
+        return TimestampSigner(self.secret(app), salt='fyyur-' + self.purpose)
+
+    def make_token(self, app):
+        return self.signer(app).sign(self.purpose).decode('utf-8')
+
+    def has_token(self, app):
+        """True if the request carries a valid, unexpired token in the
+        header (or, for browsers, in the query argument if there is one)."""
+        token = request.headers.get(self.header_name(app))
+        if not token and self.query_arg:
+            token = request.args.get(self.query_arg)
+        if not token or not self.secret(app):
+            return False
+        try:
+            self.signer(app).unsign(token, max_age=app.config.get(self.prefix + '_TOKEN_MAX_AGE', 3600))
+        except BadSignature:
+            return False
+        return True